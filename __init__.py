@@ -22,6 +22,7 @@ from tokens import (
     count_message_tokens,
     count_context_tokens,
     get_model_context_limit,
+    reset_token_cache,
     TIKTOKEN_AVAILABLE,
 )
 
@@ -56,5 +57,6 @@ __all__ = [
     "count_message_tokens",
     "count_context_tokens",
     "get_model_context_limit",
+    "reset_token_cache",
     "TIKTOKEN_AVAILABLE",
 ]
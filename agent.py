@@ -157,7 +157,11 @@ class ContextManagedAgent:
                 self.store.add_message(Message(
                     role="assistant",
                     content=message.content or "",
-                    tool_calls=[tc.model_dump() for tc in message.tool_calls]
+                    tool_calls=[{
+                        "id": tc.id,
+                        "type": "function",
+                        "function": {"name": tc.function.name, "arguments": tc.function.arguments}
+                    } for tc in message.tool_calls]
                 ))
 
                 # Process each tool call
@@ -13,12 +13,23 @@ TERMINOLOGY:
 
 from __future__ import annotations
 
+import json
+import re
 import shlex
 from dataclasses import dataclass
-from typing import Literal
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Literal, Mapping
 
 from ctx_store import ContextStore, Event
 
+# Faster parsing of tool-call arguments when orjson is installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 
 # =============================================================================
 # Tool Definition for OpenAI
@@ -134,13 +145,57 @@ def execute_plan(content: str) -> str:
     return f"Plan recorded ({len(lines)} items). Now proceed with: ctx_cli scope <path-name> -m \"<note>\""
 
 
+# A lone "command" string whose only escapes are \" (any JSON whitespace)
+_COMMAND_ARG_RE = re.compile(r'\{\s*"command"\s*:\s*"((?:[^"\\]|\\")*)"\s*\}')
+
+
+def extract_command(arguments: str) -> str:
+    """
+    Get the command string out of ctx_cli tool-call arguments.
+
+    Models nearly always send a bare {"command": "..."} whose only escapes
+    are the quotes around -m notes; that shape is matched directly and
+    anything else is parsed as JSON (with orjson when available).
+    """
+    match = _COMMAND_ARG_RE.fullmatch(arguments)
+    if match:
+        return match.group(1).replace('\\"', '"')
+    if ORJSON_AVAILABLE:
+        return orjson.loads(arguments)["command"]
+    return json.loads(arguments)["command"]
+
+
 # =============================================================================
 # Command Parser
 # =============================================================================
 
-@dataclass
+# Commands made only of bare words and plain "double-quoted" arguments, the
+# shape models send, split the same way under shlex and these regexes
+_SIMPLE_COMMAND_RE = re.compile(r'[ \t\r\n]*(?:(?:"[^"\\]*"|[^ \t\r\n"\'\\]+)(?:[ \t\r\n]+|$))*')
+_TOKEN_RE = re.compile(r'"([^"\\]*)"|([^ \t\r\n"\'\\]+)')
+# First word of a command, split on the same whitespace as _split_command
+_HEAD_RE = re.compile(r'[^ \t\r\n]*')
+_QUOTE_CHARS = frozenset('"\'\\')
+
+
+def _split_command(command: str) -> list[str]:
+    """Split a command like shlex.split, skipping shlex for simple commands."""
+    if _SIMPLE_COMMAND_RE.fullmatch(command):
+        return [
+            quoted if quoted is not None else bare
+            for quoted, bare in (m.groups() for m in _TOKEN_RE.finditer(command))
+        ]
+    return shlex.split(command)
+
+
+@dataclass(frozen=True)
 class ParsedCommand:
-    """Result of parsing a ctx_cli command."""
+    """
+    Result of parsing a ctx_cli command.
+
+    Immutable (args is a read-only mapping) because parse_command shares
+    results between calls with the same command string.
+    """
 
     action: Literal[
         # Core semantic commands
@@ -149,14 +204,18 @@ class ParsedCommand:
         "anchor", "pause", "resume", "delta", "rewind", "extract", "sync",
         # Internal actions (mapped from semantic commands)
         "commit", "checkout", "branch", "log", "tag", "stash",
-        "diff", "reset", "cherry-pick", "merge",
+        "diff", "reset", "cherry-pick", "merge", "bisect",
         "status", "history",
         "error"
     ]
-    args: dict
+    args: Mapping[str, Any]
     error: str | None = None
 
+    def __post_init__(self):
+        object.__setattr__(self, "args", MappingProxyType(self.args))
+
 
+@lru_cache(maxsize=512)
 def parse_command(command: str) -> ParsedCommand:
     """
     Parse a ctx_cli command string into structured form.
@@ -176,8 +235,16 @@ def parse_command(command: str) -> ParsedCommand:
         extract <id>               -> selective memory
         sync <path> -m "message"   -> synchronize paths
     """
+    command = command.strip()
+
+    # Reject unknown command words before tokenizing the rest. Words with
+    # quotes or escapes are left to the tokenizer, which may unquote them.
+    head = _HEAD_RE.match(command).group().lower()
+    if head and head not in _PARSERS and not _QUOTE_CHARS.intersection(head):
+        return _unknown_command(head)
+
     try:
-        tokens = shlex.split(command.strip())
+        tokens = _split_command(command)
     except ValueError as e:
         return ParsedCommand(action="error", args={}, error=f"Parse error: {e}")
 
@@ -185,511 +252,652 @@ def parse_command(command: str) -> ParsedCommand:
         return ParsedCommand(action="error", args={}, error="Empty command")
 
     action = tokens[0].lower()
+    parser = _PARSERS.get(action)
+    if parser is not None:
+        return parser(action, tokens)
 
-    # -------------------------------------------------------------------------
-    # scope <name> -m "note" - Create new scope, note stays in CURRENT (origin)
-    # -------------------------------------------------------------------------
-    if action == "scope":
-        scope_name = None
-        note = None
-        i = 1
+    return _unknown_command(action)
+
+
+def _unknown_command(action: str) -> ParsedCommand:
+    return ParsedCommand(
+        action="error",
+        args={},
+        error=f"Unknown command: {action}. Use: scope, goto, note, scopes, notes"
+    )
 
-        while i < len(tokens):
-            if tokens[i] == "-m" and i + 1 < len(tokens):
-                note = tokens[i + 1]
-                i += 2
-            elif not scope_name and not tokens[i].startswith("-"):
-                scope_name = tokens[i]
-                i += 1
-            else:
-                i += 1
 
-        if not scope_name:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="scope requires name. Example: scope step-1 -m \"why I'm creating this\""
-            )
-
-        if not note:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="scope requires -m \"note\". Explain WHY you're creating this scope."
-            )
-
-        # Returns "scope" action - executor will:
-        # 1. commit note to CURRENT branch
-        # 2. then checkout to new branch
+# -------------------------------------------------------------------------
+# scope <name> -m "note" - Create new scope, note stays in CURRENT (origin)
+# -------------------------------------------------------------------------
+def _parse_scope(action: str, tokens: list[str]) -> ParsedCommand:
+    scope_name = None
+    note = None
+    i = 1
+
+    while i < len(tokens):
+        if tokens[i] == "-m" and i + 1 < len(tokens):
+            note = tokens[i + 1]
+            i += 2
+        elif not scope_name and not tokens[i].startswith("-"):
+            scope_name = tokens[i]
+            i += 1
+        else:
+            i += 1
+
+    if not scope_name:
         return ParsedCommand(
-            action="scope",
-            args={"name": scope_name, "note": note}
+            action="error",
+            args={},
+            error="scope requires name. Example: scope step-1 -m \"why I'm creating this\""
         )
 
-    # -------------------------------------------------------------------------
-    # goto <name> -m "note" - Switch to scope, note goes to DESTINATION
-    # -------------------------------------------------------------------------
-    if action == "goto":
-        scope_name = None
-        note = None
-        i = 1
+    if not note:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error="scope requires -m \"note\". Explain WHY you're creating this scope."
+        )
+
+    # Returns "scope" action - executor will:
+    # 1. commit note to CURRENT branch
+    # 2. then checkout to new branch
+    return ParsedCommand(
+        action="scope",
+        args={"name": scope_name, "note": note}
+    )
 
-        while i < len(tokens):
-            if tokens[i] == "-m" and i + 1 < len(tokens):
-                note = tokens[i + 1]
-                i += 2
-            elif not scope_name and not tokens[i].startswith("-"):
-                scope_name = tokens[i]
-                i += 1
-            else:
-                i += 1
 
-        if not scope_name:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="goto requires scope name. Example: goto main -m \"what I bring/conclude\""
-            )
-
-        if not note:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="goto requires -m \"note\". Explain what you bring to the destination."
-            )
-
-        # Returns "goto" action - executor will:
-        # 1. checkout to destination branch
-        # 2. commit note to DESTINATION branch
+# -------------------------------------------------------------------------
+# goto <name> -m "note" - Switch to scope, note goes to DESTINATION
+# -------------------------------------------------------------------------
+def _parse_goto(action: str, tokens: list[str]) -> ParsedCommand:
+    scope_name = None
+    note = None
+    i = 1
+
+    while i < len(tokens):
+        if tokens[i] == "-m" and i + 1 < len(tokens):
+            note = tokens[i + 1]
+            i += 2
+        elif not scope_name and not tokens[i].startswith("-"):
+            scope_name = tokens[i]
+            i += 1
+        else:
+            i += 1
+
+    if not scope_name:
         return ParsedCommand(
-            action="goto",
-            args={"name": scope_name, "note": note}
+            action="error",
+            args={},
+            error="goto requires scope name. Example: goto main -m \"what I bring/conclude\""
         )
 
-    # -------------------------------------------------------------------------
-    # note -m "message" - Record episodic memory
-    # -------------------------------------------------------------------------
-    if action == "note":
-        message = None
-        i = 1
-        while i < len(tokens):
-            if tokens[i] == "-m" and i + 1 < len(tokens):
-                message = tokens[i + 1]
-                i += 2
-            else:
-                i += 1
+    if not note:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error="goto requires -m \"note\". Explain what you bring to the destination."
+        )
 
-        if not message:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="note requires -m \"message\". Write what you learned!"
-            )
-
-        return ParsedCommand(action="commit", args={"message": message})
-
-    # -------------------------------------------------------------------------
-    # scopes - List all scopes
-    # -------------------------------------------------------------------------
-    if action == "scopes":
-        return ParsedCommand(action="scopes", args={})
-
-    # -------------------------------------------------------------------------
-    # notes [scope] - List notes in scope (default: current)
-    # -------------------------------------------------------------------------
-    if action == "notes":
-        scope_name = tokens[1] if len(tokens) > 1 else None
-        return ParsedCommand(action="notes", args={"scope": scope_name})
-
-    # Legacy: paths -> scopes
-    if action == "paths":
-        return ParsedCommand(action="scopes", args={})
-
-    # Legacy: trace -> notes (for viewing other scopes, use notes <scope>)
-    if action == "trace":
-        scope_name = tokens[1] if len(tokens) > 1 else None
-        return ParsedCommand(action="notes", args={"scope": scope_name})
-
-    # -------------------------------------------------------------------------
-    # anchor <name> -m "description" - Create immutable marker
-    # -------------------------------------------------------------------------
-    if action == "anchor":
-        if len(tokens) < 2:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="anchor requires a name"
-            )
-
-        name = tokens[1]
-        description = ""
-        i = 2
+    # Returns "goto" action - executor will:
+    # 1. checkout to destination branch
+    # 2. commit note to DESTINATION branch
+    return ParsedCommand(
+        action="goto",
+        args={"name": scope_name, "note": note}
+    )
 
-        while i < len(tokens):
-            if tokens[i] == "-m" and i + 1 < len(tokens):
-                description = tokens[i + 1]
-                i += 2
-            else:
-                i += 1
 
-        return ParsedCommand(action="tag", args={"name": name, "description": description})
+# -------------------------------------------------------------------------
+# note -m "message" - Record episodic memory
+# -------------------------------------------------------------------------
+def _parse_note(action: str, tokens: list[str]) -> ParsedCommand:
+    message = None
+    i = 1
+    while i < len(tokens):
+        if tokens[i] == "-m" and i + 1 < len(tokens):
+            message = tokens[i + 1]
+            i += 2
+        else:
+            i += 1
+
+    if not message:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error="note requires -m \"message\". Write what you learned!"
+        )
 
-    # -------------------------------------------------------------------------
-    # pause -m "message" - Archive current work
-    # -------------------------------------------------------------------------
-    if action == "pause":
-        message = "WIP"
-        i = 1
-        while i < len(tokens):
-            if tokens[i] == "-m" and i + 1 < len(tokens):
-                message = tokens[i + 1]
-                i += 2
-            else:
-                i += 1
-        return ParsedCommand(action="stash", args={"subaction": "push", "message": message})
+    return ParsedCommand(action="commit", args={"message": message})
 
-    # -------------------------------------------------------------------------
-    # resume [id] - Resume archived work
-    # -------------------------------------------------------------------------
-    if action == "resume":
-        stash_id = tokens[1] if len(tokens) > 1 else None
-        return ParsedCommand(action="stash", args={"subaction": "pop", "stash_id": stash_id})
 
-    # -------------------------------------------------------------------------
-    # delta <path> - Compare paths
-    # -------------------------------------------------------------------------
-    if action == "delta":
-        if len(tokens) < 2:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="delta requires a path name to compare"
-            )
-        return ParsedCommand(action="diff", args={"branch": tokens[1]})
-
-    # -------------------------------------------------------------------------
-    # rewind [id] [--hard] - Go back in time
-    # -------------------------------------------------------------------------
-    if action == "rewind":
-        note_id = None
-        hard = False
-        i = 1
+# -------------------------------------------------------------------------
+# scopes - List all scopes
+# -------------------------------------------------------------------------
+def _parse_scopes(action: str, tokens: list[str]) -> ParsedCommand:
+    return ParsedCommand(action="scopes", args={})
 
-        while i < len(tokens):
-            if tokens[i] == "--hard":
-                hard = True
-                i += 1
-            elif not note_id and not tokens[i].startswith("-"):
-                note_id = tokens[i]
-                i += 1
-            else:
-                i += 1
 
-        return ParsedCommand(action="reset", args={"commit": note_id, "hard": hard})
-
-    # -------------------------------------------------------------------------
-    # extract <note-id> - Selective memory
-    # -------------------------------------------------------------------------
-    if action == "extract":
-        if len(tokens) < 2:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="extract requires a note ID"
-            )
-        return ParsedCommand(action="cherry-pick", args={"commit": tokens[1]})
-
-    # -------------------------------------------------------------------------
-    # sync <path> -m "message" - Synchronize paths
-    # -------------------------------------------------------------------------
-    if action == "sync":
-        if len(tokens) < 2:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="sync requires a path name"
-            )
-
-        path = tokens[1]
-        message = None
-        i = 2
+# -------------------------------------------------------------------------
+# notes [scope] - List notes in scope (default: current)
+# -------------------------------------------------------------------------
+def _parse_notes(action: str, tokens: list[str]) -> ParsedCommand:
+    scope_name = tokens[1] if len(tokens) > 1 else None
+    return ParsedCommand(action="notes", args={"scope": scope_name})
 
-        while i < len(tokens):
-            if tokens[i] == "-m" and i + 1 < len(tokens):
-                message = tokens[i + 1]
-                i += 2
-            else:
-                i += 1
 
-        return ParsedCommand(action="merge", args={"branch": path, "message": message})
+# Legacy: paths -> scopes
+def _parse_paths(action: str, tokens: list[str]) -> ParsedCommand:
+    return ParsedCommand(action="scopes", args={})
 
-    # =========================================================================
-    # LEGACY COMMANDS (backwards compatibility)
-    # =========================================================================
 
-    # commit/save -> note
-    if action in ("commit", "save"):
-        message = None
-        i = 1
-        while i < len(tokens):
-            if tokens[i] == "-m" and i + 1 < len(tokens):
-                message = tokens[i + 1]
-                i += 2
-            else:
-                i += 1
+# Legacy: trace -> notes (for viewing other scopes, use notes <scope>)
+def _parse_trace(action: str, tokens: list[str]) -> ParsedCommand:
+    scope_name = tokens[1] if len(tokens) > 1 else None
+    return ParsedCommand(action="notes", args={"scope": scope_name})
 
-        if not message:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error=f"{action} requires -m \"message\". Prefer using 'note -m \"...\"'"
-            )
 
-        return ParsedCommand(action="commit", args={"message": message})
+# -------------------------------------------------------------------------
+# anchor <name> -m "description" - Create immutable marker
+# -------------------------------------------------------------------------
+def _parse_anchor(action: str, tokens: list[str]) -> ParsedCommand:
+    if len(tokens) < 2:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error="anchor requires a name"
+        )
+
+    name = tokens[1]
+    description = ""
+    i = 2
+
+    while i < len(tokens):
+        if tokens[i] == "-m" and i + 1 < len(tokens):
+            description = tokens[i + 1]
+            i += 2
+        else:
+            i += 1
+
+    return ParsedCommand(action="tag", args={"name": name, "description": description})
+
+
+# -------------------------------------------------------------------------
+# pause -m "message" - Archive current work
+# -------------------------------------------------------------------------
+def _parse_pause(action: str, tokens: list[str]) -> ParsedCommand:
+    message = "WIP"
+    i = 1
+    while i < len(tokens):
+        if tokens[i] == "-m" and i + 1 < len(tokens):
+            message = tokens[i + 1]
+            i += 2
+        else:
+            i += 1
+    return ParsedCommand(action="stash", args={"subaction": "push", "message": message})
+
+
+# -------------------------------------------------------------------------
+# resume [id] - Resume archived work
+# -------------------------------------------------------------------------
+def _parse_resume(action: str, tokens: list[str]) -> ParsedCommand:
+    stash_id = tokens[1] if len(tokens) > 1 else None
+    return ParsedCommand(action="stash", args={"subaction": "pop", "stash_id": stash_id})
+
+
+# -------------------------------------------------------------------------
+# delta <path> - Compare paths
+# -------------------------------------------------------------------------
+def _parse_delta(action: str, tokens: list[str]) -> ParsedCommand:
+    if len(tokens) < 2:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error="delta requires a path name to compare"
+        )
+    return ParsedCommand(action="diff", args={"branch": tokens[1]})
+
+
+# -------------------------------------------------------------------------
+# rewind [id] [--hard] - Go back in time
+# -------------------------------------------------------------------------
+def _parse_rewind(action: str, tokens: list[str]) -> ParsedCommand:
+    note_id = None
+    hard = False
+    i = 1
+
+    while i < len(tokens):
+        if tokens[i] == "--hard":
+            hard = True
+            i += 1
+        elif not note_id and not tokens[i].startswith("-"):
+            note_id = tokens[i]
+            i += 1
+        else:
+            i += 1
+
+    return ParsedCommand(action="reset", args={"commit": note_id, "hard": hard})
+
+
+# -------------------------------------------------------------------------
+# extract <note-id> - Selective memory
+# -------------------------------------------------------------------------
+def _parse_extract(action: str, tokens: list[str]) -> ParsedCommand:
+    if len(tokens) < 2:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error="extract requires a note ID"
+        )
+    return ParsedCommand(action="cherry-pick", args={"commit": tokens[1]})
 
-    # checkout -> begin/goto
-    if action == "checkout":
-        branch_name = None
-        note = None
-        create = False
-        i = 1
 
-        while i < len(tokens):
-            if tokens[i] == "-b":
-                create = True
-                i += 1
-            elif tokens[i] == "-m" and i + 1 < len(tokens):
-                note = tokens[i + 1]
-                i += 2
-            elif not branch_name and not tokens[i].startswith("-"):
-                branch_name = tokens[i]
-                i += 1
-            else:
-                i += 1
+# -------------------------------------------------------------------------
+# sync <path> -m "message" - Synchronize paths
+# -------------------------------------------------------------------------
+def _parse_sync(action: str, tokens: list[str]) -> ParsedCommand:
+    if len(tokens) < 2:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error="sync requires a path name"
+        )
 
-        if not branch_name:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="checkout requires branch name. Prefer 'begin' or 'goto'"
-            )
+    path = tokens[1]
+    message = None
+    i = 2
 
-        if not note:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="checkout requires -m \"note\". Prefer 'begin' or 'goto'"
-            )
+    while i < len(tokens):
+        if tokens[i] == "-m" and i + 1 < len(tokens):
+            message = tokens[i + 1]
+            i += 2
+        else:
+            i += 1
 
+    return ParsedCommand(action="merge", args={"branch": path, "message": message})
+
+
+# =========================================================================
+# LEGACY COMMANDS (backwards compatibility)
+# =========================================================================
+
+# commit/save -> note
+def _parse_commit(action: str, tokens: list[str]) -> ParsedCommand:
+    message = None
+    i = 1
+    while i < len(tokens):
+        if tokens[i] == "-m" and i + 1 < len(tokens):
+            message = tokens[i + 1]
+            i += 2
+        else:
+            i += 1
+
+    if not message:
         return ParsedCommand(
-            action="checkout",
-            args={"branch": branch_name, "note": note, "create": create}
+            action="error",
+            args={},
+            error=f"{action} requires -m \"message\". Prefer using 'note -m \"...\"'"
         )
 
-    # start/begin -> scope
-    if action in ("start", "begin"):
-        path_name = None
-        note = None
-        i = 1
+    return ParsedCommand(action="commit", args={"message": message})
+
+
+# checkout -> begin/goto
+def _parse_checkout(action: str, tokens: list[str]) -> ParsedCommand:
+    branch_name = None
+    note = None
+    create = False
+    i = 1
+
+    while i < len(tokens):
+        if tokens[i] == "-b":
+            create = True
+            i += 1
+        elif tokens[i] == "-m" and i + 1 < len(tokens):
+            note = tokens[i + 1]
+            i += 2
+        elif not branch_name and not tokens[i].startswith("-"):
+            branch_name = tokens[i]
+            i += 1
+        else:
+            i += 1
+
+    if not branch_name:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error="checkout requires branch name. Prefer 'begin' or 'goto'"
+        )
+
+    if not note:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error="checkout requires -m \"note\". Prefer 'begin' or 'goto'"
+        )
+
+    return ParsedCommand(
+        action="checkout",
+        args={"branch": branch_name, "note": note, "create": create}
+    )
 
-        while i < len(tokens):
-            if tokens[i] == "-m" and i + 1 < len(tokens):
-                note = tokens[i + 1]
-                i += 2
-            elif not path_name and not tokens[i].startswith("-"):
-                path_name = tokens[i]
-                i += 1
-            else:
-                i += 1
 
-        if not path_name:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error=f"{action} requires path name. Prefer 'scope'"
-            )
+# start/begin -> scope
+def _parse_start(action: str, tokens: list[str]) -> ParsedCommand:
+    path_name = None
+    note = None
+    i = 1
 
-        if not note:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error=f"{action} requires -m \"note\". Prefer 'scope'"
-            )
+    while i < len(tokens):
+        if tokens[i] == "-m" and i + 1 < len(tokens):
+            note = tokens[i + 1]
+            i += 2
+        elif not path_name and not tokens[i].startswith("-"):
+            path_name = tokens[i]
+            i += 1
+        else:
+            i += 1
 
+    if not path_name:
         return ParsedCommand(
-            action="checkout",
-            args={"branch": path_name, "note": note, "create": True}
+            action="error",
+            args={},
+            error=f"{action} requires path name. Prefer 'scope'"
         )
 
-    # done/return -> finish
-    if action in ("done", "return"):
-        summary = None
-        i = 1
-        while i < len(tokens):
-            if tokens[i] == "-m" and i + 1 < len(tokens):
-                summary = tokens[i + 1]
-                i += 2
-            else:
-                i += 1
+    if not note:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error=f"{action} requires -m \"note\". Prefer 'scope'"
+        )
+
+    return ParsedCommand(
+        action="checkout",
+        args={"branch": path_name, "note": note, "create": True}
+    )
+
 
-        if not summary:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error=f"{action} requires -m \"summary\". Prefer 'finish'"
-            )
+# done/return -> finish
+def _parse_done(action: str, tokens: list[str]) -> ParsedCommand:
+    summary = None
+    i = 1
+    while i < len(tokens):
+        if tokens[i] == "-m" and i + 1 < len(tokens):
+            summary = tokens[i + 1]
+            i += 2
+        else:
+            i += 1
 
+    if not summary:
         return ParsedCommand(
-            action="checkout",
-            args={"branch": "main", "note": summary, "create": False}
+            action="error",
+            args={},
+            error=f"{action} requires -m \"summary\". Prefer 'finish'"
         )
 
-    # branch/tasks -> paths
-    if action in ("branch", "tasks"):
-        name = tokens[1] if len(tokens) > 1 else None
-        return ParsedCommand(action="branch", args={"name": name})
-
-    # log/recall -> trace
-    if action in ("log", "recall"):
-        branch_name = tokens[1] if len(tokens) > 1 else None
-        return ParsedCommand(action="log", args={"branch": branch_name})
-
-    # tag -> anchor
-    if action == "tag":
-        if len(tokens) < 2:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="tag requires a name. Prefer 'anchor'"
-            )
-
-        name = tokens[1]
-        description = ""
-        i = 2
+    return ParsedCommand(
+        action="checkout",
+        args={"branch": "main", "note": summary, "create": False}
+    )
 
-        while i < len(tokens):
-            if tokens[i] == "-m" and i + 1 < len(tokens):
-                description = tokens[i + 1]
-                i += 2
-            else:
-                i += 1
 
-        return ParsedCommand(action="tag", args={"name": name, "description": description})
-
-    # stash -> pause/resume
-    if action == "stash":
-        if len(tokens) < 2:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="stash requires subcommand. Prefer 'pause' or 'resume'"
-            )
-
-        subaction = tokens[1].lower()
-
-        if subaction == "push":
-            message = "WIP"
-            i = 2
-            while i < len(tokens):
-                if tokens[i] == "-m" and i + 1 < len(tokens):
-                    message = tokens[i + 1]
-                    i += 2
-                else:
-                    i += 1
-            return ParsedCommand(action="stash", args={"subaction": "push", "message": message})
-
-        if subaction == "pop":
-            stash_id = tokens[2] if len(tokens) > 2 else None
-            return ParsedCommand(action="stash", args={"subaction": "pop", "stash_id": stash_id})
-
-        if subaction == "list":
-            return ParsedCommand(action="stash", args={"subaction": "list"})
+# branch/tasks -> paths
+def _parse_branch(action: str, tokens: list[str]) -> ParsedCommand:
+    name = tokens[1] if len(tokens) > 1 else None
+    return ParsedCommand(action="branch", args={"name": name})
+
 
+# log/recall -> trace
+def _parse_log(action: str, tokens: list[str]) -> ParsedCommand:
+    branch_name = tokens[1] if len(tokens) > 1 else None
+    return ParsedCommand(action="log", args={"branch": branch_name})
+
+
+# tag -> anchor
+def _parse_tag(action: str, tokens: list[str]) -> ParsedCommand:
+    if len(tokens) < 2:
         return ParsedCommand(
             action="error",
             args={},
-            error=f"Unknown stash subcommand: {subaction}"
+            error="tag requires a name. Prefer 'anchor'"
         )
 
-    # diff -> delta
-    if action == "diff":
-        if len(tokens) < 2:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="diff requires a path name. Prefer 'delta'"
-            )
-        return ParsedCommand(action="diff", args={"branch": tokens[1]})
-
-    # reset -> rewind
-    if action == "reset":
-        commit = None
-        hard = False
-        i = 1
+    name = tokens[1]
+    description = ""
+    i = 2
 
-        while i < len(tokens):
-            if tokens[i] == "--hard":
-                hard = True
-                i += 1
-            elif not commit and not tokens[i].startswith("-"):
-                commit = tokens[i]
-                i += 1
-            else:
-                i += 1
+    while i < len(tokens):
+        if tokens[i] == "-m" and i + 1 < len(tokens):
+            description = tokens[i + 1]
+            i += 2
+        else:
+            i += 1
 
-        return ParsedCommand(action="reset", args={"commit": commit, "hard": hard})
-
-    # cherry-pick -> extract
-    if action == "cherry-pick":
-        if len(tokens) < 2:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="cherry-pick requires a note ID. Prefer 'extract'"
-            )
-        return ParsedCommand(action="cherry-pick", args={"commit": tokens[1]})
-
-    # merge -> sync
-    if action == "merge":
-        if len(tokens) < 2:
-            return ParsedCommand(
-                action="error",
-                args={},
-                error="merge requires a path name. Prefer 'sync'"
-            )
-
-        branch = tokens[1]
-        message = None
-        i = 2
+    return ParsedCommand(action="tag", args={"name": name, "description": description})
+
+
+# stash -> pause/resume
+def _parse_stash(action: str, tokens: list[str]) -> ParsedCommand:
+    if len(tokens) < 2:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error="stash requires subcommand. Prefer 'pause' or 'resume'"
+        )
+
+    subaction = tokens[1].lower()
 
+    if subaction == "push":
+        message = "WIP"
+        i = 2
         while i < len(tokens):
             if tokens[i] == "-m" and i + 1 < len(tokens):
                 message = tokens[i + 1]
                 i += 2
             else:
                 i += 1
+        return ParsedCommand(action="stash", args={"subaction": "push", "message": message})
+
+    if subaction == "pop":
+        stash_id = tokens[2] if len(tokens) > 2 else None
+        return ParsedCommand(action="stash", args={"subaction": "pop", "stash_id": stash_id})
 
-        return ParsedCommand(action="merge", args={"branch": branch, "message": message})
+    if subaction == "list":
+        return ParsedCommand(action="stash", args={"subaction": "list"})
 
-    # status
-    if action == "status":
-        return ParsedCommand(action="status", args={})
+    return ParsedCommand(
+        action="error",
+        args={},
+        error=f"Unknown stash subcommand: {subaction}"
+    )
 
-    # history
-    if action == "history":
-        return ParsedCommand(action="history", args={})
+
+# bisect start|good|bad|reset - Find where reasoning diverged
+def _parse_bisect(action: str, tokens: list[str]) -> ParsedCommand:
+    if len(tokens) < 2:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error="bisect requires subcommand: start, good, bad or reset"
+        )
+
+    subaction = tokens[1].lower()
+
+    if subaction in ("start", "reset"):
+        return ParsedCommand(action="bisect", args={"subaction": subaction})
+
+    if subaction in ("good", "bad"):
+        commit = tokens[2] if len(tokens) > 2 else None
+        return ParsedCommand(action="bisect", args={"subaction": subaction, "commit": commit})
 
     return ParsedCommand(
         action="error",
         args={},
-        error=f"Unknown command: {action}. Use: scope, goto, note, scopes, notes"
+        error=f"Unknown bisect subcommand: {subaction}"
     )
 
 
+# diff -> delta
+def _parse_diff(action: str, tokens: list[str]) -> ParsedCommand:
+    if len(tokens) < 2:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error="diff requires a path name. Prefer 'delta'"
+        )
+    return ParsedCommand(action="diff", args={"branch": tokens[1]})
+
+
+# reset -> rewind
+def _parse_reset(action: str, tokens: list[str]) -> ParsedCommand:
+    commit = None
+    hard = False
+    i = 1
+
+    while i < len(tokens):
+        if tokens[i] == "--hard":
+            hard = True
+            i += 1
+        elif not commit and not tokens[i].startswith("-"):
+            commit = tokens[i]
+            i += 1
+        else:
+            i += 1
+
+    return ParsedCommand(action="reset", args={"commit": commit, "hard": hard})
+
+
+# cherry-pick -> extract
+def _parse_cherry_pick(action: str, tokens: list[str]) -> ParsedCommand:
+    if len(tokens) < 2:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error="cherry-pick requires a note ID. Prefer 'extract'"
+        )
+    return ParsedCommand(action="cherry-pick", args={"commit": tokens[1]})
+
+
+# merge -> sync
+def _parse_merge(action: str, tokens: list[str]) -> ParsedCommand:
+    if len(tokens) < 2:
+        return ParsedCommand(
+            action="error",
+            args={},
+            error="merge requires a path name. Prefer 'sync'"
+        )
+
+    branch = tokens[1]
+    message = None
+    i = 2
+
+    while i < len(tokens):
+        if tokens[i] == "-m" and i + 1 < len(tokens):
+            message = tokens[i + 1]
+            i += 2
+        else:
+            i += 1
+
+    return ParsedCommand(action="merge", args={"branch": branch, "message": message})
+
+
+# status
+def _parse_status(action: str, tokens: list[str]) -> ParsedCommand:
+    return ParsedCommand(action="status", args={})
+
+
+# history
+def _parse_history(action: str, tokens: list[str]) -> ParsedCommand:
+    return ParsedCommand(action="history", args={})
+
+
+# Command word -> parser, built once at import so parse_command is a single lookup
+_PARSERS: dict[str, Callable[[str, list[str]], ParsedCommand]] = {
+    "scope": _parse_scope,
+    "goto": _parse_goto,
+    "note": _parse_note,
+    "scopes": _parse_scopes,
+    "notes": _parse_notes,
+    "paths": _parse_paths,
+    "trace": _parse_trace,
+    "anchor": _parse_anchor,
+    "pause": _parse_pause,
+    "resume": _parse_resume,
+    "delta": _parse_delta,
+    "rewind": _parse_rewind,
+    "extract": _parse_extract,
+    "sync": _parse_sync,
+    "commit": _parse_commit,
+    "save": _parse_commit,
+    "checkout": _parse_checkout,
+    "start": _parse_start,
+    "begin": _parse_start,
+    "done": _parse_done,
+    "return": _parse_done,
+    "branch": _parse_branch,
+    "tasks": _parse_branch,
+    "log": _parse_log,
+    "recall": _parse_log,
+    "tag": _parse_tag,
+    "stash": _parse_stash,
+    "bisect": _parse_bisect,
+    "diff": _parse_diff,
+    "reset": _parse_reset,
+    "cherry-pick": _parse_cherry_pick,
+    "merge": _parse_merge,
+    "status": _parse_status,
+    "history": _parse_history,
+}
+
+
 # =============================================================================
 # Command Executor
 # =============================================================================
 
+def _execute_stash(store: ContextStore, args: Mapping[str, Any]) -> tuple[str, Event | None]:
+    subaction = args["subaction"]
+    if subaction == "push":
+        return store.stash_push(args["message"])
+    if subaction == "pop":
+        return store.stash_pop(args.get("stash_id"))
+    if subaction == "list":
+        return store.stash_list()
+    return f"Unknown action: stash {subaction}", None
+
+
+def _execute_bisect(store: ContextStore, args: Mapping[str, Any]) -> tuple[str, Event | None]:
+    subaction = args["subaction"]
+    if subaction == "start":
+        return store.bisect_start()
+    if subaction == "good":
+        return store.bisect_good(args.get("commit"))
+    if subaction == "bad":
+        return store.bisect_bad(args.get("commit"))
+    if subaction == "reset":
+        return store.bisect_reset()
+    return f"Unknown action: bisect {subaction}", None
+
+
+# Store-level actions, dispatched by ParsedCommand.action
+_ACTION_HANDLERS: dict[str, Callable[[ContextStore, Mapping[str, Any]], tuple[str, Event | None]]] = {
+    "commit": lambda store, args: store.commit(args["message"]),
+    "checkout": lambda store, args: store.checkout(args["branch"], args["note"], args["create"]),
+    "branch": lambda store, args: store.branch(args["name"]),
+    "tag": lambda store, args: store.tag(args["name"], args["description"]),
+    "log": lambda store, args: store.log(branch_name=args.get("branch")),
+    "status": lambda store, args: store.status(),
+    "diff": lambda store, args: store.diff(args["branch"]),
+    "history": lambda store, args: store.history(),
+    "stash": _execute_stash,
+    "merge": lambda store, args: store.merge(args["branch"], args.get("message")),
+    "cherry-pick": lambda store, args: store.cherry_pick(args["commit"]),
+    "bisect": _execute_bisect,
+    "reset": lambda store, args: store.reset(args.get("commit"), args.get("hard", False)),
+}
+
+
 def execute_command(store: ContextStore, command: str) -> tuple[str, Event | None]:
     """
     Execute a ctx_cli command on the store.
@@ -768,50 +976,8 @@ def execute_command(store: ContextStore, command: str) -> tuple[str, Event | Non
     # Legacy/internal commands
     # =========================================================================
 
-    if parsed.action == "commit":
-        return store.commit(parsed.args["message"])
-
-    if parsed.action == "checkout":
-        return store.checkout(
-            parsed.args["branch"],
-            parsed.args["note"],
-            parsed.args["create"]
-        )
-
-    if parsed.action == "branch":
-        return store.branch(parsed.args["name"])
-
-    if parsed.action == "tag":
-        return store.tag(parsed.args["name"], parsed.args["description"])
-
-    if parsed.action == "log":
-        return store.log(branch_name=parsed.args.get("branch"))
-
-    if parsed.action == "status":
-        return store.status()
-
-    if parsed.action == "diff":
-        return store.diff(parsed.args["branch"])
-
-    if parsed.action == "history":
-        return store.history()
-
-    if parsed.action == "stash":
-        subaction = parsed.args["subaction"]
-        if subaction == "push":
-            return store.stash_push(parsed.args["message"])
-        if subaction == "pop":
-            return store.stash_pop(parsed.args.get("stash_id"))
-        if subaction == "list":
-            return store.stash_list()
-
-    if parsed.action == "merge":
-        return store.merge(parsed.args["branch"], parsed.args.get("message"))
-
-    if parsed.action == "cherry-pick":
-        return store.cherry_pick(parsed.args["commit"])
-
-    if parsed.action == "reset":
-        return store.reset(parsed.args.get("commit"), parsed.args.get("hard", False))
+    handler = _ACTION_HANDLERS.get(parsed.action)
+    if handler is not None:
+        return handler(store, parsed.args)
 
     return f"Unknown action: {parsed.action}", None
@@ -11,7 +11,14 @@ import hashlib
 import json
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Literal, TypedDict
+from typing import Iterator, Literal, TypedDict
+
+# orjson speeds up save/load when installed; the file format is the same JSON
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 
 # =============================================================================
@@ -147,6 +154,13 @@ class StashEntry:
     commits: list[Commit]
 
 
+# Length of the abbreviated hashes shown to the model (and sent back as refs)
+_SHORT_HASH_LEN = 7
+
+# Distinct system prompts get_context keeps a memoized context for
+_CONTEXT_CACHE_SLOTS = 4
+
+
 @dataclass
 class Branch:
     """A branch contains working messages and commits."""
@@ -156,10 +170,32 @@ class Branch:
     commits: list[Commit] = field(default_factory=list)
     created_at: str = field(default_factory=lambda: datetime.now().isoformat())
     head_note: str | None = None  # Note from checkout transition
+    # (commits list, length, last commit, {hash[:7]: [indexes]}) for find_commit
+    _commit_index: tuple | None = field(default=None, init=False, repr=False, compare=False)
 
     def get_last_commit_hash(self) -> str | None:
         return self.commits[-1].hash if self.commits else None
 
+    def find_commit(self, ref: str) -> int | None:
+        """Index of the first commit whose hash starts with ref, or None."""
+        commits = self.commits
+        if len(ref) < _SHORT_HASH_LEN:
+            return next((i for i, c in enumerate(commits) if c.hash.startswith(ref)), None)
+
+        # Rebuilt when the list is replaced or grows/shrinks at the end
+        last = commits[-1] if commits else None
+        cached = self._commit_index
+        if cached is None or cached[0] is not commits or cached[1] != len(commits) or cached[2] is not last:
+            index: dict[str, list[int]] = {}
+            for i, c in enumerate(commits):
+                index.setdefault(c.hash[:_SHORT_HASH_LEN], []).append(i)
+            cached = self._commit_index = (commits, len(commits), last, index)
+
+        for i in cached[3].get(ref[:_SHORT_HASH_LEN], ()):
+            if commits[i].hash.startswith(ref):
+                return i
+        return None
+
     def add_message(self, message: Message) -> None:
         self.messages.append(message)
 
@@ -170,18 +206,17 @@ class Branch:
         if system_prompt:
             result.append({"role": "system", "content": system_prompt})
 
-
         # Add commit summaries as context
         if self.commits:
-            commit_context = "[EPISODIC MEMORY - Previous commits in this branch]\n"
-            for c in self.commits[-5:]:  # Last 5 commits
-                commit_context += f"- [{c.hash[:7]}] {c.message}\n"
+            commit_context = "[EPISODIC MEMORY - Previous commits in this branch]\n" + "".join(
+                f"- [{c.hash[:7]}] {c.message}\n"
+                for c in self.commits[-5:]  # Last 5 commits
+            )
             result.append({"role": "system", "content": commit_context})
 
         # Add working messages with validation
         validated_messages = self._validate_tool_call_sequence(self.messages)
-        for msg in validated_messages:
-            result.append(msg.to_openai_format())
+        result.extend(msg.to_openai_format() for msg in validated_messages)
 
         return result
 
@@ -257,15 +292,26 @@ class ContextStore:
     stash: list[StashEntry] = field(default_factory=list)
     current_branch: str = "main"
     command_history: list[str] = field(default_factory=list)
+    # Same events as `events`, grouped by type for O(1) lookups
+    events_by_type: dict[str, list[Event]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # Memoized get_context results, one entry per system prompt, so callers
+    # with and without a prompt (agent loop vs. policies) don't evict each other
+    _context_cache: dict[str | None, tuple] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # Bumped by every store method that changes state (commands emit events),
+    # so readers can cache work derived from the store against it
+    version: int = field(default=0, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         # Always ensure main branch exists
         if "main" not in self.branches:
             self.branches["main"] = Branch(name="main")
+        for event in self.events:
+            self.events_by_type.setdefault(event.type, []).append(event)
 
     def _generate_hash(self, content: str) -> str:
         """Generate a short hash for commits."""
-        return hashlib.sha256(content.encode()).hexdigest()[:12]
+        # blake2b with a 6-byte digest gives the 12 hex chars directly
+        return hashlib.blake2b(content.encode(), digest_size=6).hexdigest()
 
     def _emit_event(self, event_type: str, payload: dict) -> Event:
         """Create and store an event."""
@@ -276,11 +322,18 @@ class ContextStore:
             payload=payload,
         )
         self.events.append(event)
+        self.events_by_type.setdefault(event_type, []).append(event)
+        self.version += 1
         return event
 
     def _get_current_branch(self) -> Branch:
         return self.branches[self.current_branch]
 
+    @property
+    def current_branch_obj(self) -> Branch:
+        """The Branch object for current_branch."""
+        return self.branches[self.current_branch]
+
     # =========================================================================
     # Git-like Commands
     # =========================================================================
@@ -564,23 +617,40 @@ class ContextStore:
         if not branch.commits:
             return f"No commits on '{display_name}' yet.", self._emit_event("log", {"commits": []})
 
-        lines = [f"Commit history for '{display_name}':\n"]
-
-        for commit in reversed(branch.commits[-limit:]):
-            # Check if this commit has a tag
-            tag_names = [t.name for t in self.tags.values() if t.commit_hash == commit.hash]
-            tag_str = f" (tag: {', '.join(tag_names)})" if tag_names else ""
-
-            lines.append(f"  [{commit.hash[:7]}]{tag_str} {commit.message}")
-            lines.append(f"    {commit.timestamp}")
-
         self.command_history.append(f"log {branch_name or ''}")
 
-        return "\n".join(lines), self._emit_event("log", {
+        return "\n".join(self.log_lines(branch_name, limit)), self._emit_event("log", {
             "branch": display_name,
             "commits": [c.to_dict() for c in branch.commits[-limit:]]
         })
 
+    def log_lines(self, branch_name: str | None = None, limit: int = 10) -> Iterator[str]:
+        """Yield the lines of `log` one by one.
+
+        Unlike log(), this emits no event and isn't recorded in the command
+        history, so callers that only display the output can iterate it directly.
+        """
+        branch = self.branches[branch_name] if branch_name else self._get_current_branch()
+        display_name = branch_name or self.current_branch
+
+        if not branch.commits:
+            yield f"No commits on '{display_name}' yet."
+            return
+
+        # Group tags by commit once instead of scanning all tags per commit
+        tags_by_hash: dict[str, list[str]] = {}
+        for t in self.tags.values():
+            tags_by_hash.setdefault(t.commit_hash, []).append(t.name)
+
+        yield f"Commit history for '{display_name}':\n"
+
+        for commit in reversed(branch.commits[-limit:]):
+            tag_names = tags_by_hash.get(commit.hash)
+            tag_str = f" (tag: {', '.join(tag_names)})" if tag_names else ""
+
+            yield f"  [{commit.hash[:7]}]{tag_str} {commit.message}"
+            yield f"    {commit.timestamp}"
+
     def status(self) -> tuple[str, Event]:
         """Show current context status."""
         branch = self._get_current_branch()
@@ -640,13 +710,12 @@ class ContextStore:
 
     def history(self, limit: int = 20) -> tuple[str, Event]:
         """Show recent commands."""
+        recent = self.command_history[-limit:]
         lines = ["Recent commands:\n"]
-
-        for i, cmd in enumerate(self.command_history[-limit:], 1):
-            lines.append(f"  {i}. ctx_cli {cmd}")
+        lines.extend(f"  {i}. ctx_cli {cmd}" for i, cmd in enumerate(recent, 1))
 
         return "\n".join(lines), self._emit_event("history", {
-            "commands": self.command_history[-limit:]
+            "commands": recent
         })
 
     def stash_push(self, message: str = "WIP") -> tuple[str, Event]:
@@ -854,12 +923,10 @@ class ContextStore:
 
         # Search for commit in all branches
         for branch_name, branch in self.branches.items():
-            for commit in branch.commits:
-                if commit.hash.startswith(commit_ref):
-                    target_commit = commit
-                    source_branch_name = branch_name
-                    break
-            if target_commit:
+            idx = branch.find_commit(commit_ref)
+            if idx is not None:
+                target_commit = branch.commits[idx]
+                source_branch_name = branch_name
                 break
 
         if not target_commit:
@@ -943,16 +1010,14 @@ class ContextStore:
 
         # Find commit
         if commit_ref:
-            commit_idx = None
-            for i, c in enumerate(current.commits):
-                if c.hash.startswith(commit_ref):
-                    commit_idx = i
-                    break
+            commit_idx = current.find_commit(commit_ref)
             if commit_idx is None:
                 return f"error: commit '{commit_ref}' not found", None
         else:
             # Use current bisect position or first commit
-            commit_idx = self._bisect_state.get("current_idx", 0)
+            commit_idx = self._bisect_state.get("current_idx")
+            if commit_idx is None:
+                commit_idx = 0
 
         self._bisect_state["good"] = commit_idx
         commit = current.commits[commit_idx]
@@ -978,16 +1043,14 @@ class ContextStore:
 
         # Find commit
         if commit_ref:
-            commit_idx = None
-            for i, c in enumerate(current.commits):
-                if c.hash.startswith(commit_ref):
-                    commit_idx = i
-                    break
+            commit_idx = current.find_commit(commit_ref)
             if commit_idx is None:
                 return f"error: commit '{commit_ref}' not found", None
         else:
             # Use current bisect position or last commit
-            commit_idx = self._bisect_state.get("current_idx", len(current.commits) - 1)
+            commit_idx = self._bisect_state.get("current_idx")
+            if commit_idx is None:
+                commit_idx = len(current.commits) - 1
 
         self._bisect_state["bad"] = commit_idx
         commit = current.commits[commit_idx]
@@ -1064,11 +1127,7 @@ class ContextStore:
 
         if commit_ref:
             # Find the commit
-            target_idx = None
-            for i, c in enumerate(current.commits):
-                if c.hash.startswith(commit_ref):
-                    target_idx = i
-                    break
+            target_idx = current.find_commit(commit_ref)
 
             if target_idx is None:
                 return f"error: commit '{commit_ref}' not found", None
@@ -1080,7 +1139,7 @@ class ContextStore:
 
         # Remove commits after target
         removed_count = len(current.commits) - target_idx - 1
-        current.commits = current.commits[:target_idx + 1]
+        del current.commits[target_idx + 1:]
 
         if hard:
             current.messages = []
@@ -1108,30 +1167,103 @@ class ContextStore:
     def add_message(self, message: Message) -> None:
         """Add a message to current branch's working memory."""
         self._get_current_branch().add_message(message)
+        self.version += 1
 
     def remove_last_messages(self, n: int) -> None:
         """Remove the last n messages from current branch."""
         branch = self._get_current_branch()
         if n > 0 and len(branch.messages) >= n:
             branch.messages = branch.messages[:-n]
+            self.version += 1
 
     def set_plan(self, plan: str) -> None:
-        """Set the current plan (will be appended to system prompt)."""
+        """Set the current plan (sent right after the system prompt)."""
         self.current_plan = plan
+        self.version += 1
 
     def get_context(self, system_prompt: str | None = None) -> list[dict]:
-        """Get the current context for API call."""
-        # Append current plan to system prompt if exists
-        if system_prompt and hasattr(self, 'current_plan') and self.current_plan:
-            system_prompt = f"{system_prompt}\n\n## Current Plan\n{self.current_plan}"
-        return self._get_current_branch().get_messages_for_api(system_prompt)
+        """Get the current context for API call.
+
+        The built context is memoized: agent loops call this every round,
+        usually without the branch having changed in between.
+        """
+        branch = self._get_current_branch()
+        plan = getattr(self, 'current_plan', None)
+        messages, commits = branch.messages, branch.commits
+        last_message = messages[-1] if messages else None
+        last_commit = commits[-1] if commits else None
+        # commit/reset/stash swap in new message lists, reset truncates the
+        # commits in place and add_message changes the length and last
+        # message, so ids + lengths identify the state. The
+        # referenced objects are kept alive in the cache so ids can't be reused.
+        key = (
+            id(branch), id(messages), len(messages), id(last_message),
+            len(commits), id(last_commit), system_prompt, plan,
+        )
+        cached = self._context_cache.get(system_prompt)
+        if cached is not None and cached[0] == key:
+            return list(cached[2])
+
+        chars = None
+        if cached is not None and self._can_extend_context(cached, key, messages):
+            # Only messages were appended after a settled prefix: validate
+            # and convert just the new tail
+            start = cached[0][2]
+            tail = [m.to_openai_format() for m in branch._validate_tool_call_sequence(messages[start:])]
+            context = cached[2] + tail
+            if cached[3] is not None:
+                chars = cached[3] + sum(len(str(m)) for m in tail)
+        else:
+            context = branch.get_messages_for_api(system_prompt)
+            # The plan goes in its own message so the system prompt stays
+            # byte-identical across calls and remains a cacheable prefix
+            if system_prompt and plan:
+                context.insert(1, {
+                    "role": "system",
+                    "content": f"## Current Plan\n{plan}",
+                })
+        if system_prompt not in self._context_cache and len(self._context_cache) >= _CONTEXT_CACHE_SLOTS:
+            # Drop the oldest prompt's entry
+            del self._context_cache[next(iter(self._context_cache))]
+        self._context_cache[system_prompt] = (key, (branch, messages, last_message, last_commit), context, chars)
+        return list(context)
+
+    def get_context_chars(self, system_prompt: str | None = None) -> int:
+        """Characters in get_context(system_prompt), as summed str() lengths.
+
+        Kept alongside the memoized context, so appending messages only
+        adds the length of the new ones.
+        """
+        self.get_context(system_prompt)
+        key, refs, context, chars = self._context_cache[system_prompt]
+        if chars is None:
+            chars = sum(len(str(m)) for m in context)
+            self._context_cache[system_prompt] = (key, refs, context, chars)
+        return chars
+
+    @staticmethod
+    def _can_extend_context(cached: tuple, key: tuple, messages: list[Message]) -> bool:
+        """Check if a cached context can be extended with newly appended messages.
+
+        Tool-call validation of a prefix is final once it ends in a regular
+        message: nothing appended later can complete or orphan a chain in it.
+        """
+        old_key, (_, _, old_last, _), _, _ = cached
+        start = old_key[2]
+        if old_last is None or old_last.role == "tool" or old_last.tool_calls:
+            return False
+        # Same branch, message list, commits, prompt and plan; longer list
+        return (
+            old_key[:2] == key[:2]
+            and old_key[4:] == key[4:]
+            and len(messages) > start
+            and messages[start - 1] is old_last
+        )
 
     def get_token_estimate(self) -> int:
         """Rough estimate of tokens in current context."""
         # Very rough: ~4 chars per token
-        context = self.get_context()
-        total_chars = sum(len(str(m)) for m in context)
-        return total_chars // 4
+        return self.get_context_chars() // 4
 
     # =========================================================================
     # Serialization
@@ -1168,14 +1300,22 @@ class ContextStore:
 
     def save(self, path: str) -> None:
         """Save store to JSON file."""
-        with open(path, "w") as f:
+        if ORJSON_AVAILABLE:
+            with open(path, "wb") as f:
+                f.write(orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2))
+            return
+        with open(path, "w", encoding="utf-8") as f:
             json.dump(self.to_dict(), f, indent=2)
 
     @classmethod
     def load(cls, path: str) -> "ContextStore":
         """Load store from JSON file."""
-        with open(path) as f:
-            data = json.load(f)
+        if ORJSON_AVAILABLE:
+            with open(path, "rb") as f:
+                data = orjson.loads(f.read())
+        else:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
 
         store = cls()
         store.current_branch = data["current_branch"]
@@ -7,13 +7,12 @@ helps manage context without overflow.
 
 from __future__ import annotations
 
-import json
 import os
 from datetime import datetime
 
 from openai import OpenAI
 
-from ctx_cli import CTX_CLI_TOOL, execute_command
+from ctx_cli import CTX_CLI_TOOL, execute_command, extract_command
 from ctx_store import ContextStore, Message
 
 
@@ -27,6 +26,8 @@ IMPORTANT: Use ctx_cli proactively:
 
 This keeps your context clean and your reasoning organized."""
 
+TOOLS = (CTX_CLI_TOOL,)
+
 
 def run_demo():
     """Run a simulated long-running agent session."""
@@ -44,8 +45,6 @@ def run_demo():
     client = OpenAI(api_key=api_key)
     store = ContextStore()
 
-    tools = [CTX_CLI_TOOL]
-
     def chat(user_message: str, max_tool_rounds: int = 5) -> str:
         """Simple chat function with tool handling."""
         store.add_message(Message(role="user", content=user_message))
@@ -56,7 +55,7 @@ def run_demo():
             response = client.chat.completions.create(
                 model="gpt-4.1-mini",
                 messages=context,
-                tools=tools,
+                tools=TOOLS,
             )
 
             message = response.choices[0].message
@@ -66,16 +65,20 @@ def run_demo():
                 store.add_message(Message(
                     role="assistant",
                     content=message.content or "",
-                    tool_calls=[tc.model_dump() for tc in message.tool_calls]
+                    tool_calls=[{
+                        "id": tc.id,
+                        "type": "function",
+                        "function": {"name": tc.function.name, "arguments": tc.function.arguments}
+                    } for tc in message.tool_calls]
                 ))
 
                 # Collect all tool results BEFORE executing any that modify state
                 tool_results = []
                 for tool_call in message.tool_calls:
                     if tool_call.function.name == "ctx_cli":
-                        args = json.loads(tool_call.function.arguments)
-                        result, event = execute_command(store, args["command"])
-                        print(f"  [ctx_cli] {args['command']}")
+                        cmd = extract_command(tool_call.function.arguments)
+                        result, event = execute_command(store, cmd)
+                        print(f"  [ctx_cli] {cmd}")
                         print(f"  [result] {result}")
                         tool_results.append((tool_call.id, result))
 
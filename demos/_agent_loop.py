@@ -0,0 +1,167 @@
+"""
+Shared agent loop for the ctx_cli demos.
+
+Runs one user turn: call the model, execute ctx_cli tool calls, repeat
+until the model answers without tools. Demo-specific output and policy
+checks plug in through callbacks.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Callable, Sequence
+
+import httpx
+from openai import OpenAI
+
+from ctx_cli import CTX_CLI_TOOL, execute_command, extract_command
+from ctx_store import ContextStore, Message
+
+# HTTP/2 needs the optional h2 package (pip install ctx-cli[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def create_client(api_key: str | None = None) -> OpenAI:
+    """
+    Create an OpenAI client that keeps its connection alive between rounds.
+
+    Demos make dozens of sequential calls; a kept-alive (and, when h2 is
+    installed, HTTP/2) connection pays the TLS handshake once per run.
+    """
+    http_client = httpx.Client(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60.0),
+        timeout=httpx.Timeout(600.0, connect=5.0),
+    )
+    return OpenAI(api_key=api_key, http_client=http_client)
+
+
+def _collect_stream(chunks) -> SimpleNamespace:
+    """Assemble streamed chunks into an object shaped like a response message."""
+    parts: list[str] = []
+    calls: dict[int, SimpleNamespace] = {}
+
+    for chunk in chunks:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            parts.append(delta.content)
+        for tc in delta.tool_calls or ():
+            call = calls.get(tc.index)
+            if call is None:
+                call = calls[tc.index] = SimpleNamespace(
+                    id=tc.id,
+                    function=SimpleNamespace(name="", arguments=""),
+                )
+            if tc.id:
+                call.id = tc.id
+            if tc.function:
+                if tc.function.name:
+                    call.function.name += tc.function.name
+                if tc.function.arguments:
+                    call.function.arguments += tc.function.arguments
+
+    return SimpleNamespace(
+        content="".join(parts),
+        tool_calls=[calls[i] for i in sorted(calls)] or None,
+    )
+
+
+def run_agent_loop(
+    client: OpenAI,
+    store: ContextStore,
+    system_prompt: str,
+    user_message: str,
+    tools: Sequence[dict] = (CTX_CLI_TOOL,),
+    model: str = "gpt-4.1-mini",
+    max_rounds: int = 8,
+    on_request: Callable[[list[dict]], None] | None = None,
+    on_message: Callable[[Message], None] | None = None,
+    on_command: Callable[[str, str], None] | None = None,
+    on_round_end: Callable[[], None] | None = None,
+    on_final: Callable[[str], None] | None = None,
+    stream: bool = False,
+) -> str:
+    """
+    Run a user turn to completion and return the final assistant content.
+
+    Callbacks:
+        on_request(context): before each API call, with the context sent
+        on_message(message): after the loop adds a message to the store
+        on_command(command, result): after each ctx_cli command runs
+        on_round_end(): after each round's messages are in the store
+        on_final(content): once the model answers without tool calls
+
+    With stream=True the response is read as it is generated and the
+    deltas are assembled into the same message shape.
+    """
+    def add(message: Message) -> None:
+        store.add_message(message)
+        if on_message:
+            on_message(message)
+
+    add(Message(role="user", content=user_message))
+
+    for _ in range(max_rounds):
+        context = store.get_context(system_prompt)
+        if on_request:
+            on_request(context)
+
+        response = client.chat.completions.create(
+            model=model,
+            messages=context,
+            tools=tools,
+            stream=stream,
+        )
+
+        message = _collect_stream(response) if stream else response.choices[0].message
+        content = message.content or ""
+
+        if message.tool_calls:
+            add(Message(
+                role="assistant",
+                content=content,
+                tool_calls=[{
+                    "id": tc.id,
+                    "type": "function",
+                    "function": {"name": tc.function.name, "arguments": tc.function.arguments}
+                } for tc in message.tool_calls]
+            ))
+
+            # Collect all tool results BEFORE adding them: commit/checkout
+            # rely on the assistant tool_calls message being the last one
+            tool_results = []
+            for tool_call in message.tool_calls:
+                if tool_call.function.name == "ctx_cli":
+                    cmd = extract_command(tool_call.function.arguments)
+                    result, _ = execute_command(store, cmd)
+                    if on_command:
+                        on_command(cmd, result)
+                    tool_results.append((tool_call.id, result))
+
+            for tool_id, result in tool_results:
+                add(Message(
+                    role="tool",
+                    content=result,
+                    tool_call_id=tool_id,
+                ))
+        else:
+            add(Message(
+                role="assistant",
+                content=content,
+            ))
+
+        if on_round_end:
+            on_round_end()
+
+        if not message.tool_calls:
+            if on_final:
+                on_final(content)
+            return content
+
+    return "[Max rounds]"
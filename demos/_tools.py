@@ -0,0 +1,30 @@
+"""
+Shared file tool helpers for the ctx_cli demos.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+
+# read_file returns at most this many characters
+READ_LIMIT = 3000
+
+
+@lru_cache(maxsize=128)
+def _read_head(path: Path, mtime_ns: int, size: int) -> str:
+    """Read the start of a file; mtime_ns and size only key the cache."""
+    with open(path, encoding="utf-8") as f:
+        return f.read()[:READ_LIMIT]
+
+
+def read_file(path: Path) -> str:
+    """
+    Return the first READ_LIMIT characters of a UTF-8 file.
+
+    Agents re-read the same files between steps, so the disk read is
+    skipped while neither mtime nor size has changed. Raises
+    FileNotFoundError for a missing file.
+    """
+    st = path.stat()
+    return _read_head(path, st.st_mtime_ns, st.st_size)
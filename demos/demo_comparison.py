@@ -10,7 +10,6 @@ Compares token usage, context management, and information preservation.
 
 from __future__ import annotations
 
-import json
 import os
 import sys
 import time
@@ -19,9 +18,27 @@ from openai import OpenAI
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from ctx_cli import CTX_CLI_TOOL, execute_command
+from ctx_cli import CTX_CLI_TOOL, execute_command, extract_command
 from ctx_store import ContextStore, Message
-from tokens import TokenTracker
+from demos._agent_loop import create_client
+from tokens import TokenTracker, get_model_context_limit
+
+TOOLS = (CTX_CLI_TOOL,)
+
+# Routes both approaches' requests to the same provider-side prompt cache
+PROMPT_CACHE_KEY = "ctx-cli-comparison"
+
+# Context window of the model both runs use and the tokens kept free for
+# the reply. Past MAX_CTX - CONTEXT_RESERVE both approaches get the same
+# wrap-up prompt, once.
+MAX_CTX = get_model_context_limit("gpt-4.1-mini")
+CONTEXT_RESERVE = 2_000
+BUDGET_PROMPT = "Context budget nearly exhausted - summarize the current state and wrap up."
+
+
+def over_budget(tokens: int) -> bool:
+    """Whether a request of this size leaves less than the reply reserve."""
+    return tokens > MAX_CTX - CONTEXT_RESERVE
 
 # Same task for both approaches
 TASK_STEPS = [
@@ -36,6 +53,15 @@ TASK_STEPS = [
 ]
 
 
+def cached_prompt_tokens(response) -> int:
+    """Prompt tokens the provider served from its prompt cache."""
+    # Older openai 1.x responses have no prompt_tokens_details, or None
+    details = getattr(response.usage, "prompt_tokens_details", None)
+    if details is None:
+        return 0
+    return getattr(details, "cached_tokens", None) or 0
+
+
 def run_linear_approach(client: OpenAI, tracker: TokenTracker) -> dict:
     """Run the task using traditional linear conversation."""
     print("\n" + "=" * 70)
@@ -44,7 +70,11 @@ def run_linear_approach(client: OpenAI, tracker: TokenTracker) -> dict:
     print("Running same task without context management...\n")
 
     messages = [{"role": "system", "content": "You are a software architect designing a system."}]
-    token_history = []
+    token_history = []  # One entry per step, only for the growth curve
+    peak_tokens = 0
+    final_tokens = 0
+    cached_tokens = 0
+    budget_warned = False
     start_time = time.time()
 
     for i, step in enumerate(TASK_STEPS, 1):
@@ -54,12 +84,20 @@ def run_linear_approach(client: OpenAI, tracker: TokenTracker) -> dict:
 
         # Track tokens before API call
         tokens = tracker.count_messages(messages)
+        if not budget_warned and over_budget(tokens):
+            budget_warned = True
+            messages.append({"role": "user", "content": BUDGET_PROMPT})
+            tokens = tracker.count_messages(messages)
         token_history.append(tokens)
+        peak_tokens = max(peak_tokens, tokens)
+        final_tokens = tokens
 
         response = client.chat.completions.create(
             model="gpt-4.1-mini",
             messages=messages,
+            extra_body={"prompt_cache_key": PROMPT_CACHE_KEY},
         )
+        cached_tokens += cached_prompt_tokens(response)
 
         assistant_msg = response.choices[0].message.content
         messages.append({"role": "assistant", "content": assistant_msg})
@@ -70,10 +108,11 @@ def run_linear_approach(client: OpenAI, tracker: TokenTracker) -> dict:
 
     return {
         "approach": "linear",
-        "final_tokens": token_history[-1] if token_history else 0,
-        "max_tokens": max(token_history) if token_history else 0,
+        "final_tokens": final_tokens,
+        "max_tokens": peak_tokens,
         "token_history": token_history,
         "message_count": len(messages),
+        "cached_tokens": cached_tokens,
         "elapsed_time": elapsed,
     }
 
@@ -86,9 +125,11 @@ def run_scope_approach(client: OpenAI, tracker: TokenTracker) -> dict:
     print("Running same task with context management...\n")
 
     store = ContextStore()
-    tools = [CTX_CLI_TOOL]
-    token_history = []
+    token_history = []  # One entry per step, only for the growth curve
+    peak_tokens = 0
+    final_tokens = 0
     notes_made = 0
+    cached_tokens = 0
     start_time = time.time()
 
     system_prompt = """You are a software architect designing a system.
@@ -103,19 +144,29 @@ Key commands:
 - note -m "description" - Save your current reasoning
 - goto main -m "summary" - Return with findings"""
 
+    budget_warned = False
+
     def chat(user_message: str) -> int:
-        nonlocal notes_made
+        nonlocal notes_made, cached_tokens, budget_warned
         store.add_message(Message(role="user", content=user_message))
 
         for _ in range(5):  # Max tool call rounds
             context = store.get_context(system_prompt)
             tokens = tracker.count_messages(context)
 
+            if not budget_warned and over_budget(tokens):
+                budget_warned = True
+                store.add_message(Message(role="user", content=BUDGET_PROMPT))
+                context = store.get_context(system_prompt)
+                tokens = tracker.count_messages(context)
+
             response = client.chat.completions.create(
                 model="gpt-4.1-mini",
                 messages=context,
-                tools=tools,
+                tools=TOOLS,
+                extra_body={"prompt_cache_key": PROMPT_CACHE_KEY},
             )
+            cached_tokens += cached_prompt_tokens(response)
 
             message = response.choices[0].message
 
@@ -123,23 +174,24 @@ Key commands:
                 store.add_message(Message(
                     role="assistant",
                     content=message.content or "",
-                    tool_calls=[tc.model_dump() for tc in message.tool_calls]
+                    tool_calls=[{
+                        "id": tc.id,
+                        "type": "function",
+                        "function": {"name": tc.function.name, "arguments": tc.function.arguments}
+                    } for tc in message.tool_calls]
                 ))
 
                 for tool_call in message.tool_calls:
                     if tool_call.function.name == "ctx_cli":
-                        args = json.loads(tool_call.function.arguments)
-                        result, _ = execute_command(store, args["command"])
-                        if "note" in args["command"]:
+                        cmd = extract_command(tool_call.function.arguments)
+                        result, _ = execute_command(store, cmd)
+                        if "note" in cmd:
                             notes_made += 1
                         store.add_message(Message(
                             role="tool",
                             content=result,
                             tool_call_id=tool_call.id,
                         ))
-
-                # Refresh context after tool calls
-                context = store.get_context(system_prompt)
             else:
                 store.add_message(Message(
                     role="assistant",
@@ -153,17 +205,20 @@ Key commands:
         print(f"Step {i}: {step[:50]}...")
         tokens = chat(step)
         token_history.append(tokens)
+        peak_tokens = max(peak_tokens, tokens)
+        final_tokens = tokens
         print(f"  → Tokens: {tokens}, Notes: {notes_made}")
 
     elapsed = time.time() - start_time
 
     return {
         "approach": "scope",
-        "final_tokens": token_history[-1] if token_history else 0,
-        "max_tokens": max(token_history) if token_history else 0,
+        "final_tokens": final_tokens,
+        "max_tokens": peak_tokens,
         "token_history": token_history,
         "message_count": sum(len(b.messages) for b in store.branches.values()),
         "notes_made": notes_made,
+        "cached_tokens": cached_tokens,
         "scopes": len(store.branches),
         "elapsed_time": elapsed,
     }
@@ -176,7 +231,6 @@ def run_comparison():
         print("Error: Set OPENAI_API_KEY")
         return
 
-    client = OpenAI(api_key=api_key)
     tracker = TokenTracker(model="gpt-4.1-mini")
 
     print("=" * 70)
@@ -185,9 +239,15 @@ def run_comparison():
     print(f"\nTask: Design a blog platform ({len(TASK_STEPS)} steps)")
     print("Running both approaches with the same task...\n")
 
-    # Run both approaches
-    linear_results = run_linear_approach(client, tracker)
-    scope_results = run_scope_approach(client, tracker)
+    # One client for both approaches so they share the kept-alive connection
+    with create_client(api_key) as client:
+        # Warm up the connection pool so the first approach doesn't pay
+        # DNS + TLS setup inside its timed section
+        client.models.list()
+
+        # Run both approaches
+        linear_results = run_linear_approach(client, tracker)
+        scope_results = run_scope_approach(client, tracker)
 
     # =========================================================================
     # Comparison Results
@@ -210,14 +270,18 @@ def run_comparison():
 
     print(f"  {'Max tokens':.<25} {linear_max:>12,} {scope_max:>12,} {savings_max:>11.1f}%")
     print(f"  {'Final tokens':.<25} {linear_final:>12,} {scope_final:>12,} {savings_final:>11.1f}%")
+    print(f"  {'Cached prompt tokens':.<25} {linear_results['cached_tokens']:>12,} {scope_results['cached_tokens']:>12,}")
 
     print("\n📈 Token Growth Curve:")
     print(f"  Step   │ {'Linear':>10} │ {'Scope':>10} │ Difference")
     print(f"  {'─' * 6}┼{'─' * 12}┼{'─' * 12}┼{'─' * 12}")
+    rows = []
     for i, (l, s) in enumerate(zip(linear_results["token_history"], scope_results["token_history"]), 1):
         diff = l - s
         diff_str = f"+{diff}" if diff > 0 else str(diff)
-        print(f"  {i:>5} │ {l:>10,} │ {s:>10,} │ {diff_str:>10}")
+        rows.append(f"  {i:>5} │ {l:>10,} │ {s:>10,} │ {diff_str:>10}")
+    if rows:
+        print("\n".join(rows))
 
     print("\n📋 Context Management:")
     print(f"  {'Metric':<30} {'Linear':>12} {'Scope':>12}")
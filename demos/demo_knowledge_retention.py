@@ -17,6 +17,7 @@ import json
 import os
 import sys
 import tempfile
+from pathlib import Path
 
 from openai import OpenAI
 
@@ -24,6 +25,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from ctx_cli import CTX_CLI_TOOL, execute_command
 from ctx_store import ContextStore, Message
+from demos._agent_loop import create_client
+from demos._tools import read_file
 from tokens import TokenTracker
 
 # =============================================================================
@@ -61,23 +64,27 @@ WRITE_FILE_TOOL = {
     }
 }
 
+# Tool sets are fixed for the whole run, so build them once at import
+LINEAR_TOOLS = (READ_FILE_TOOL, WRITE_FILE_TOOL)
+CTX_TOOLS = LINEAR_TOOLS + (CTX_CLI_TOOL,)
 
-def execute_tool(tool_name: str, args: dict, workdir: str) -> str:
-    """Execute a tool."""
+
+def execute_tool(tool_name: str, args: dict, workdir: Path) -> str:
+    """Execute a tool relative to an already-resolved workdir."""
     try:
         if tool_name == "read_file":
-            path = os.path.join(workdir, args["path"])
-            if os.path.exists(path):
-                with open(path) as f:
-                    return f.read()[:3000]
-            return f"Error: File not found: {args['path']}"
+            try:
+                return read_file(workdir / args["path"])
+            except FileNotFoundError:
+                return f"Error: File not found: {args['path']}"
 
         elif tool_name == "write_file":
-            path = os.path.join(workdir, args["path"])
-            os.makedirs(os.path.dirname(path), exist_ok=True) if os.path.dirname(path) else None
-            with open(path, "w") as f:
-                f.write(args["content"])
-            return f"Written {len(args['content'])} bytes to {args['path']}"
+            path = workdir / args["path"]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            data = args["content"].encode("utf-8")
+            with open(path, "wb") as f:
+                f.write(data)
+            return f"Written {len(data)} bytes to {args['path']}"
 
         elif tool_name == "plan":
             return "Plan recorded. Proceed with your next action."
@@ -209,13 +216,15 @@ def run_task(
     task: str,
     task_name: str,
     system_prompt: str,
-    tools: list[dict],
+    tools: tuple[dict, ...],
     workdir: str,
     store: ContextStore | None = None,
+    client: OpenAI | None = None,
 ) -> tuple[dict, ContextStore | None]:
     """Run a single task."""
-    client = OpenAI()
+    client = client or OpenAI()
     tracker = TokenTracker(model="gpt-4.1-mini")
+    base = Path(workdir)
     base_input = 0  # system + tools + user (cacheable by providers)
     peak_input = 0  # maximum context window size
 
@@ -291,7 +300,7 @@ def run_task(
                     if cmd.startswith("goto main"):
                         returned_to_main = True
                 else:
-                    result = execute_tool(name, args, workdir)
+                    result = execute_tool(name, args, base)
 
                 # Highlight memory access
                 if name == "ctx_cli" and "notes" in args.get("command", ""):
@@ -343,7 +352,8 @@ def run_comparison():
     print("# LINEAR APPROACH - No memory between projects")
     print("#"*70)
 
-    with tempfile.TemporaryDirectory() as project_a_linear:
+    # Each approach reuses one client (and connection) for both projects
+    with create_client() as client, tempfile.TemporaryDirectory() as project_a_linear:
         with tempfile.TemporaryDirectory() as project_b_linear:
 
             # Project A
@@ -351,8 +361,9 @@ def run_comparison():
                 task=PROJECT_A_TASK,
                 task_name="PROJECT A: User Model (Linear)",
                 system_prompt=SYSTEM_PROMPT_LINEAR,
-                tools=[READ_FILE_TOOL, WRITE_FILE_TOOL],
+                tools=LINEAR_TOOLS,
                 workdir=project_a_linear,
+                client=client,
             )
 
             print("\n" + "-"*40)
@@ -364,15 +375,16 @@ def run_comparison():
                 task=PROJECT_B_TASK_LINEAR,
                 task_name="PROJECT B: Product Model (Linear - no memory)",
                 system_prompt=SYSTEM_PROMPT_LINEAR,
-                tools=[READ_FILE_TOOL, WRITE_FILE_TOOL],
+                tools=LINEAR_TOOLS,
                 workdir=project_b_linear,
+                client=client,
             )
 
     print("\n" + "#"*70)
     print("# SCOPE APPROACH - Episodic memory across projects")
     print("#"*70)
 
-    with tempfile.TemporaryDirectory() as project_a_branch:
+    with create_client() as client, tempfile.TemporaryDirectory() as project_a_branch:
         with tempfile.TemporaryDirectory() as project_b_branch:
 
             store = ContextStore()
@@ -382,9 +394,10 @@ def run_comparison():
                 task=PROJECT_A_TASK,
                 task_name="PROJECT A: User Model (Scope)",
                 system_prompt=SYSTEM_PROMPT_BRANCH,
-                tools=[READ_FILE_TOOL, WRITE_FILE_TOOL, CTX_CLI_TOOL],
+                tools=CTX_TOOLS,
                 workdir=project_a_branch,
                 store=store,
+                client=client,
             )
 
             print("\n" + "-"*40)
@@ -403,9 +416,10 @@ def run_comparison():
                 task=PROJECT_B_TASK_BRANCH,
                 task_name="PROJECT B: Product Model (Scope - with memory)",
                 system_prompt=SYSTEM_PROMPT_BRANCH,
-                tools=[READ_FILE_TOOL, WRITE_FILE_TOOL, CTX_CLI_TOOL],
+                tools=CTX_TOOLS,
                 workdir=project_b_branch,
                 store=store,
+                client=client,
             )
 
     # Results
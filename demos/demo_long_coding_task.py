@@ -17,6 +17,7 @@ import subprocess
 import sys
 import tempfile
 import time
+from pathlib import Path
 
 from openai import OpenAI
 
@@ -24,6 +25,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from ctx_cli import CTX_CLI_TOOL, PLAN_TOOL, execute_command, execute_plan
 from ctx_store import ContextStore, Message
+from demos._agent_loop import create_client
+from demos._tools import read_file
 from tokens import TokenTracker
 
 # =============================================================================
@@ -91,9 +94,13 @@ LIST_FILES_TOOL = {
     }
 }
 
+# Tool sets are fixed for the whole run, so build them once at import
+LINEAR_TOOLS = (BASH_TOOL, READ_FILE_TOOL, WRITE_FILE_TOOL, LIST_FILES_TOOL)
+CTX_TOOLS = LINEAR_TOOLS + (CTX_CLI_TOOL,)
 
-def execute_tool(tool_name: str, args: dict, workdir: str) -> str:
-    """Execute a tool."""
+
+def execute_tool(tool_name: str, args: dict, workdir: Path) -> str:
+    """Execute a tool relative to an already-resolved workdir."""
     try:
         if tool_name == "bash":
             result = subprocess.run(
@@ -104,22 +111,22 @@ def execute_tool(tool_name: str, args: dict, workdir: str) -> str:
             return output[:2000] if output else "(no output)"
 
         elif tool_name == "read_file":
-            path = os.path.join(workdir, args["path"])
-            if os.path.exists(path):
-                with open(path) as f:
-                    return f.read()[:3000]
-            return f"Error: File not found: {args['path']}"
+            try:
+                return read_file(workdir / args["path"])
+            except FileNotFoundError:
+                return f"Error: File not found: {args['path']}"
 
         elif tool_name == "write_file":
-            path = os.path.join(workdir, args["path"])
-            os.makedirs(os.path.dirname(path), exist_ok=True) if os.path.dirname(path) else None
-            with open(path, "w") as f:
-                f.write(args["content"])
-            return f"Written {len(args['content'])} bytes to {args['path']}"
+            path = workdir / args["path"]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            data = args["content"].encode("utf-8")
+            with open(path, "wb") as f:
+                f.write(data)
+            return f"Written {len(data)} bytes to {args['path']}"
 
         elif tool_name == "list_files":
-            path = os.path.join(workdir, args.get("path", "."))
-            if os.path.exists(path):
+            path = workdir / args.get("path", ".")
+            if path.exists():
                 return "\n".join(os.listdir(path)) or "(empty)"
             return f"Error: Not found: {args.get('path', '.')}"
 
@@ -283,14 +290,16 @@ def run_approach(
     approach: str,
     steps: list[str],
     system_prompt: str,
-    tools: list[dict],
+    tools: tuple[dict, ...],
     workdir: str,
     use_ctx: bool = False,
+    client: OpenAI | None = None,
 ) -> dict:
     """Run a multi-step task with given approach."""
-    client = OpenAI()
+    client = client or OpenAI()
     tracker = TokenTracker(model="gpt-4.1-mini")
     store = ContextStore() if use_ctx else None
+    base = Path(workdir)
     peak_input = 0
 
     # Initial user message with first step
@@ -369,7 +378,7 @@ def run_approach(
                 elif name == "plan":
                     result = "Plan recorded. Now proceed with: ctx_cli scope <name> -m <note>"
                 else:
-                    result = execute_tool(name, args, workdir)
+                    result = execute_tool(name, args, base)
 
                 print(f"  [{name}] {str(args)[:50]}... -> {result[:50]}...")
 
@@ -437,16 +446,18 @@ def run_comparison(num_steps: int = 6):
     """Run comparison between linear and scope approaches."""
     steps = TASK_STEPS[:num_steps]
 
-    with tempfile.TemporaryDirectory() as tmpdir_linear:
+    # Both approaches share one client and its kept-alive connection
+    with create_client() as client, tempfile.TemporaryDirectory() as tmpdir_linear:
         with tempfile.TemporaryDirectory() as tmpdir_branch:
             # Linear approach
             linear_result = run_approach(
                 approach="LINEAR",
                 steps=steps,
                 system_prompt=SYSTEM_PROMPT_LINEAR,
-                tools=[BASH_TOOL, READ_FILE_TOOL, WRITE_FILE_TOOL, LIST_FILES_TOOL],
+                tools=LINEAR_TOOLS,
                 workdir=tmpdir_linear,
                 use_ctx=False,
+                client=client,
             )
 
             # Scope approach
@@ -454,9 +465,10 @@ def run_comparison(num_steps: int = 6):
                 approach="SCOPE (ctx_cli)",
                 steps=steps,
                 system_prompt=SYSTEM_PROMPT_BRANCH,
-                tools=[BASH_TOOL, READ_FILE_TOOL, WRITE_FILE_TOOL, LIST_FILES_TOOL, CTX_CLI_TOOL],
+                tools=CTX_TOOLS,
                 workdir=tmpdir_branch,
                 use_ctx=True,
+                client=client,
             )
 
     # Print comparison
@@ -12,16 +12,18 @@ Shows how scopes enable parallel exploration of alternatives.
 
 from __future__ import annotations
 
-import json
 import os
 import sys
-
-from openai import OpenAI
+import textwrap
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from ctx_cli import CTX_CLI_TOOL, execute_command
-from ctx_store import ContextStore, Message
+from ctx_store import ContextStore
+from demos._agent_loop import create_client, run_agent_loop
+
+BAR_60 = "━" * 60
+SEP_70 = "=" * 70
 
 SYSTEM_PROMPT = """You are a technical architect planning a software project.
 
@@ -49,6 +51,92 @@ You have ctx_cli for exploring and comparing different approaches:
 
 Think of scopes as parallel universes for exploring "what if" scenarios."""
 
+# Passed unchanged on every request so the tool schema stays a stable prefix
+TOOLS = (CTX_CLI_TOOL,)
+
+# How each ctx_cli command with arguments is echoed, keyed by its first
+# word; the bare listing commands are echoed only on an exact match
+_CMD_ECHO = {
+    "scope": lambda cmd: f"  🌿 SCOPE: {cmd}",
+    "goto": lambda cmd: f"  🔀 GOTO: {cmd}",
+    "note": lambda cmd: f"  📝 NOTE: {cmd[:50]}...",
+}
+_LIST_COMMANDS = ("scopes", "notes")
+
+
+def _echo_command(cmd: str) -> str:
+    """Format a ctx_cli command for the demo output."""
+    if cmd in _LIST_COMMANDS:
+        return f"  📋 {cmd.upper()}"
+    head, sep, _ = cmd.partition(" ")
+    echo = _CMD_ECHO.get(head) if sep else None
+    return echo(cmd) if echo else f"  [ctx] {cmd[:40]}"
+
+
+# The planning session: (user message, label) per turn, grouped by phase
+TURNS = [
+    # Phase 1: Gather requirements
+    (textwrap.dedent("""
+        I need to design a real-time collaborative document editor (like Google Docs).
+
+        Key requirements:
+        - Multiple users editing simultaneously
+        - Changes visible in real-time
+        - Offline support
+        - Version history
+        - Scale to 100 concurrent editors per document
+
+        First, take notes on the requirements, then we'll explore approaches.
+    """).strip(), "REQUIREMENTS: Collaborative Editor"),
+    # Phase 2: Explore Approach A - OT (Operational Transformation)
+    (textwrap.dedent("""
+        Let's explore our first approach: Operational Transformation (OT).
+
+        Create a scope for this approach and analyze:
+        - How OT works
+        - Pros and cons
+        - Implementation complexity
+        - Scalability considerations
+
+        Take notes on your analysis.
+    """).strip(), "APPROACH A: Operational Transformation"),
+    (textwrap.dedent("""
+        For the OT approach, what tech stack would you recommend?
+        Consider: server framework, real-time protocol, storage.
+        Take notes on the tech stack for this approach.
+    """).strip(), "APPROACH A: Tech Stack"),
+    # Phase 3: Explore Approach B - CRDT
+    (textwrap.dedent("""
+        Now let's explore the alternative: CRDTs (Conflict-free Replicated Data Types).
+
+        Go back to main, then create a new scope (not from OT scope) and analyze:
+        - How CRDTs work
+        - Pros and cons vs OT
+        - Implementation complexity
+        - Offline support advantages
+
+        Take notes on your analysis.
+    """).strip(), "APPROACH B: CRDTs"),
+    (textwrap.dedent("""
+        For the CRDT approach, what tech stack would you use?
+        There are libraries like Yjs, Automerge - consider those.
+        Take notes on the tech stack for this approach.
+    """).strip(), "APPROACH B: Tech Stack"),
+    # Phase 4: Compare and decide
+    (textwrap.dedent("""
+        Now let's compare the two approaches.
+
+        Review your notes from both scopes and give me your recommendation:
+        which approach should we choose?
+    """).strip(), "COMPARISON: OT vs CRDT"),
+    (textwrap.dedent("""
+        Based on your analysis, let's go with your recommended approach.
+
+        Return to main with your final recommendation and take a summary note.
+        Show me the final state and your notes.
+    """).strip(), "DECISION: Final Architecture"),
+]
+
 
 def run_planning():
     """Demonstrate planning with scope alternatives."""
@@ -57,181 +145,66 @@ def run_planning():
         print("Error: Set OPENAI_API_KEY")
         return
 
-    client = OpenAI(api_key=api_key)
     store = ContextStore()
-    tools = [CTX_CLI_TOOL]
+
+    def print_reply(content: str) -> None:
+        ellipsis = "..." if len(content) > 280 else ""
+        print(f"\n  {content[:280]}{ellipsis}")
 
     def chat(user_message: str, label: str = "") -> str:
         if label:
-            print(f"\n{'━' * 60}")
+            print(f"\n{BAR_60}")
             print(f"  {label}")
-            print(f"{'━' * 60}")
-
-        store.add_message(Message(role="user", content=user_message))
-
-        for _ in range(12):
-            context = store.get_context(SYSTEM_PROMPT)
-
-            response = client.chat.completions.create(
-                model="gpt-4.1-mini",
-                messages=context,
-                tools=tools,
-            )
-
-            message = response.choices[0].message
-
-            if message.tool_calls:
-                store.add_message(Message(
-                    role="assistant",
-                    content=message.content or "",
-                    tool_calls=[tc.model_dump() for tc in message.tool_calls]
-                ))
-
-                tool_results = []
-                for tool_call in message.tool_calls:
-                    if tool_call.function.name == "ctx_cli":
-                        args = json.loads(tool_call.function.arguments)
-                        result, _ = execute_command(store, args["command"])
-                        cmd = args["command"]
-                        if cmd.startswith("scope "):
-                            print(f"  🌿 SCOPE: {cmd}")
-                        elif cmd.startswith("goto "):
-                            print(f"  🔀 GOTO: {cmd}")
-                        elif cmd.startswith("note "):
-                            print(f"  📝 NOTE: {cmd[:50]}...")
-                        elif cmd in ("scopes", "notes"):
-                            print(f"  📋 {cmd.upper()}")
-                        else:
-                            print(f"  [ctx] {cmd[:40]}")
-                        tool_results.append((tool_call.id, result))
-
-                for tool_id, result in tool_results:
-                    store.add_message(Message(
-                        role="tool",
-                        content=result,
-                        tool_call_id=tool_id,
-                    ))
-            else:
-                store.add_message(Message(
-                    role="assistant",
-                    content=message.content or "",
-                ))
-                response_short = (message.content or "")[:280]
-                if len(message.content or "") > 280:
-                    response_short += "..."
-                print(f"\n  {response_short}")
-                return message.content or ""
-
-        return "[Max rounds]"
-
-    print("=" * 70)
+            print(f"{BAR_60}")
+
+        return run_agent_loop(
+            client, store, SYSTEM_PROMPT, user_message,
+            tools=TOOLS,
+            max_rounds=12,
+            on_command=lambda cmd, result: print(_echo_command(cmd)),
+            on_final=print_reply,
+        )
+
+    print(SEP_70)
     print("PLANNING AGENT DEMO: Exploring Alternatives with Scopes")
-    print("=" * 70)
+    print(SEP_70)
     print("\nSimulating architecture planning with multiple approaches...")
     print("Watch how scopes enable parallel exploration.\n")
 
-    # =========================================================================
-    # Phase 1: Gather requirements
-    # =========================================================================
-    chat("""
-    I need to design a real-time collaborative document editor (like Google Docs).
-
-    Key requirements:
-    - Multiple users editing simultaneously
-    - Changes visible in real-time
-    - Offline support
-    - Version history
-    - Scale to 100 concurrent editors per document
-
-    First, take notes on the requirements, then we'll explore approaches.
-    """, label="REQUIREMENTS: Collaborative Editor")
-
-    # =========================================================================
-    # Phase 2: Explore Approach A - OT (Operational Transformation)
-    # =========================================================================
-    chat("""
-    Let's explore our first approach: Operational Transformation (OT).
-
-    Create a scope for this approach and analyze:
-    - How OT works
-    - Pros and cons
-    - Implementation complexity
-    - Scalability considerations
-
-    Take notes on your analysis.
-    """, label="APPROACH A: Operational Transformation")
-
-    chat("""
-    For the OT approach, what tech stack would you recommend?
-    Consider: server framework, real-time protocol, storage.
-    Take notes on the tech stack for this approach.
-    """, label="APPROACH A: Tech Stack")
-
-    # =========================================================================
-    # Phase 3: Explore Approach B - CRDT
-    # =========================================================================
-    chat("""
-    Now let's explore the alternative: CRDTs (Conflict-free Replicated Data Types).
-
-    Go back to main, then create a new scope (not from OT scope) and analyze:
-    - How CRDTs work
-    - Pros and cons vs OT
-    - Implementation complexity
-    - Offline support advantages
-
-    Take notes on your analysis.
-    """, label="APPROACH B: CRDTs")
-
-    chat("""
-    For the CRDT approach, what tech stack would you use?
-    There are libraries like Yjs, Automerge - consider those.
-    Take notes on the tech stack for this approach.
-    """, label="APPROACH B: Tech Stack")
-
-    # =========================================================================
-    # Phase 4: Compare and decide
-    # =========================================================================
-    chat("""
-    Now let's compare the two approaches.
-
-    Review your notes from both scopes and give me your recommendation:
-    which approach should we choose?
-    """, label="COMPARISON: OT vs CRDT")
-
-    chat("""
-    Based on your analysis, let's go with your recommended approach.
-
-    Return to main with your final recommendation and take a summary note.
-    Show me the final state and your notes.
-    """, label="DECISION: Final Architecture")
+    # Closing the client releases its kept-alive connection
+    with create_client(api_key) as client:
+        for user_message, label in TURNS:
+            chat(user_message, label=label)
 
     # =========================================================================
     # Results
     # =========================================================================
-    print("\n" + "=" * 70)
+    print("\n" + SEP_70)
     print("PLANNING SESSION RESULTS")
-    print("=" * 70)
+    print(SEP_70)
 
     print("\n🌿 Scopes Explored:")
     result, _ = execute_command(store, "scopes")
-    for line in result.split("\n"):
-        if line.strip():
-            scope_name = line.strip().replace("* ", "→ ").replace("  ", "  ")
-            print(f"  {scope_name}")
+    print("\n".join(
+        f"  {line.strip().replace('* ', '→ ')}"
+        for line in result.split("\n") if line.strip()
+    ))
 
     print("\n📋 Decision Trail (All Notes):")
+    total_notes = 0
     for scope_name, scope in store.branches.items():
+        total_notes += len(scope.commits)
         if scope.commits:
             print(f"\n  [{scope_name}]")
             for note in scope.commits:
                 print(f"    [{note.hash[:7]}] {note.message[:50]}...")
 
     print("\n🔀 Scope Transitions:")
-    goto_events = [e for e in store.events if e.type == "checkout"]
+    goto_events = store.events_by_type.get("checkout", [])
     if goto_events:
         for e in goto_events[:5]:  # Show first 5
-            target = e.payload.get("branch", "?")
-            print(f"  → {target}")
+            # Checkout events are emitted after the switch, so e.branch is the target
+            print(f"  → {e.branch}")
     else:
         print("  (no transitions)")
 
@@ -244,7 +217,7 @@ def run_planning():
 
     print("\n📊 Planning Statistics:")
     print(f"  Alternatives explored: {len(store.branches) - 1}")  # Exclude main
-    print(f"  Total notes: {sum(len(s.commits) for s in store.branches.values())}")
+    print(f"  Total notes: {total_notes}")
     print(f"  Scope transitions: {len(goto_events)}")
 
     print("\n💡 Key Insight:")
@@ -11,19 +11,23 @@ Policies help when agents forget to take notes or context grows too large.
 
 from __future__ import annotations
 
-import json
 import os
 import sys
-
-from openai import OpenAI
+import textwrap
+from collections import Counter
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from ctx_cli import CTX_CLI_TOOL, execute_command
-from ctx_store import ContextStore, Message
+from ctx_store import ContextStore
+from demos._agent_loop import create_client, run_agent_loop
 from policies import PolicyEngine, MaxMessagesPolicy, MaxTokensPolicy, InactivityPolicy, PolicyAction
 from tokens import TokenTracker
 
+# Separator lines, built once
+SEP_50 = "─" * 50
+SEP_70 = "=" * 70
+
 SYSTEM_PROMPT = """You are a helpful assistant working on a task.
 
 You have ctx_cli for context management, but DON'T WORRY about taking notes -
@@ -34,6 +38,43 @@ milestones, you can, but it's not required.
 
 Available commands: scope, goto, note, scopes, notes"""
 
+TOOLS = (CTX_CLI_TOOL,)
+
+# The simulated conversation: (user message, label) per turn, no manual notes
+TURNS = [
+    (textwrap.dedent("""
+        Start a new scope for this task. I need help designing a REST API
+        for a todo application. What endpoints should we have?
+    """).strip(), "TASK START: API Design"),
+    (textwrap.dedent("""
+        Good list! Now let's detail the GET /todos endpoint.
+        What query parameters should it support for filtering and pagination?
+    """).strip(), "STEP 2: GET Details"),
+    (textwrap.dedent("""
+        What about POST /todos? What should the request body look like?
+        Include validation requirements.
+    """).strip(), "STEP 3: POST Details"),
+    (textwrap.dedent("""
+        Now explain PUT /todos/:id for updating a todo.
+        What's the difference between PUT and PATCH here?
+    """).strip(), "STEP 4: PUT vs PATCH"),
+    (textwrap.dedent("""
+        How should we handle DELETE /todos/:id?
+        Should it be soft delete or hard delete?
+    """).strip(), "STEP 5: DELETE Strategy"),
+    (textwrap.dedent("""
+        Let's add authentication. What auth strategy should we use?
+        JWT? Session-based? API keys?
+    """).strip(), "STEP 6: Authentication"),
+    (textwrap.dedent("""
+        Finally, how do we handle errors consistently?
+        Give me an error response format.
+    """).strip(), "STEP 7: Error Handling"),
+    (textwrap.dedent("""
+        Great session! Show me the status and log to see what happened.
+    """).strip(), "REVIEW: Check Results"),
+]
+
 
 def run_policies_demo():
     """Demonstrate auto-note policies."""
@@ -42,35 +83,69 @@ def run_policies_demo():
         print("Error: Set OPENAI_API_KEY")
         return
 
-    client = OpenAI(api_key=api_key)
     store = ContextStore()
     tracker = TokenTracker(model="gpt-4.1-mini")
-    tools = [CTX_CLI_TOOL]
+    # Running token total of the store's context (no system prompt), the
+    # same context MaxTokensPolicy measures. Added messages add their own
+    # count; commands and notes can fold or switch the context, so they
+    # mark it for a full recount (memoized per message by the tracker).
+    context_tokens = 0
+    recount = True
+
+    def tokens_in_context() -> int:
+        nonlocal context_tokens, recount
+        if recount:
+            context_tokens = tracker.count_messages(store.get_context())
+            recount = False
+        return context_tokens
+
+    def track_message(message) -> None:
+        nonlocal context_tokens
+        if not recount:
+            context_tokens += tracker.count_message(message.to_openai_format())
+
+    def mark_recount() -> None:
+        nonlocal recount
+        recount = True
 
     # Configure policies with lower thresholds for demo
-    policies = PolicyEngine([
-        MaxMessagesPolicy(max_messages=6, warn_at=4),
-        MaxTokensPolicy(max_tokens=2000, warn_at=1500, token_counter=tracker.count),
-        InactivityPolicy(max_messages_since_commit=4),
-    ])
+    # Force the note so working messages are folded into episodic
+    # memory instead of being resent on every following round
+    max_messages = MaxMessagesPolicy(max_messages=6, warn_at=4, action=PolicyAction.FORCE_COMMIT)
+    # Checked against the running total, so the context text is never built
+    max_tokens = MaxTokensPolicy(max_tokens=2000, warn_at=1500, token_total=tokens_in_context)
+    inactivity = InactivityPolicy(max_messages_since_commit=4)
+    policies = PolicyEngine([max_messages, max_tokens, inactivity])
+
+    # Below both floors none of the policies above can trigger
+    message_floor = min(max_messages.warn_at, inactivity.max_messages_since_commit)
+    token_floor = max_tokens.warn_at
 
     auto_notes = []
     policy_triggers = []
 
+    def evaluate_policies(branch) -> list:
+        """Evaluate policies once the branch is past the trigger floors."""
+        if len(branch.messages) < message_floor and tokens_in_context() < token_floor:
+            return []
+        return policies.evaluate(store)
+
     def check_and_apply_policies() -> str | None:
         """Check policies and auto-note if needed."""
-        results = policies.evaluate(store)
+        # commit() keeps the same branch object, so one lookup serves the round
+        branch = store.current_branch_obj
+        results = evaluate_policies(branch)
 
         for result in results:
             if result.triggered:
                 if result.action == PolicyAction.FORCE_COMMIT:
                     # Auto-note
-                    scope = store.branches[store.current_branch]
-                    note_msg = result.auto_commit_message or f"Auto-note: {len(scope.messages)} messages"
+                    note_msg = result.auto_commit_message or f"Auto-note: {len(branch.messages)} messages"
                     note_result, event = store.commit(note_msg)
+                    mark_recount()
                     auto_notes.append({
                         "message": note_msg,
-                        "messages_count": len(scope.messages),
+                        "messages_count": len(branch.messages),
                     })
                     policy_triggers.append("force_note")
                     return f"[AUTO-NOTE] {note_result}"
@@ -84,82 +159,44 @@ def run_policies_demo():
 
         return None
 
-    def chat(user_message: str, label: str = "") -> str:
-        if label:
-            print(f"\n{'─' * 50}")
-            print(f"  {label}")
-            print(f"{'─' * 50}")
-
-        store.add_message(Message(role="user", content=user_message))
+    def on_command(cmd: str, result: str) -> None:
+        mark_recount()
+        print(f"  [ctx] {cmd[:50]}")
 
-        # Check policies after user message
+    def apply_policies() -> None:
         policy_result = check_and_apply_policies()
         if policy_result:
             print(f"  🔔 {policy_result}")
 
-        for _ in range(8):
-            context = store.get_context(SYSTEM_PROMPT)
-            current_tokens = tracker.count_messages(context)
-
-            response = client.chat.completions.create(
-                model="gpt-4.1-mini",
-                messages=context,
-                tools=tools,
-            )
-
-            message = response.choices[0].message
-
-            if message.tool_calls:
-                store.add_message(Message(
-                    role="assistant",
-                    content=message.content or "",
-                    tool_calls=[tc.model_dump() for tc in message.tool_calls]
-                ))
-
-                tool_results = []
-                for tool_call in message.tool_calls:
-                    if tool_call.function.name == "ctx_cli":
-                        args = json.loads(tool_call.function.arguments)
-                        result, _ = execute_command(store, args["command"])
-                        print(f"  [ctx] {args['command'][:50]}")
-                        tool_results.append((tool_call.id, result))
-
-                for tool_id, result in tool_results:
-                    store.add_message(Message(
-                        role="tool",
-                        content=result,
-                        tool_call_id=tool_id,
-                    ))
-
-                # Check policies after tool use
-                policy_result = check_and_apply_policies()
-                if policy_result:
-                    print(f"  🔔 {policy_result}")
-            else:
-                store.add_message(Message(
-                    role="assistant",
-                    content=message.content or "",
-                ))
-
-                # Check policies after assistant response
-                policy_result = check_and_apply_policies()
-                if policy_result:
-                    print(f"  🔔 {policy_result}")
-
-                response_short = (message.content or "")[:200]
-                if len(message.content or "") > 200:
-                    response_short += "..."
-                print(f"\n  💬 {response_short}")
-                print(f"  📊 Context: {current_tokens} tokens, {len(store.branches[store.current_branch].messages)} messages")
-                return message.content or ""
-
-        return "[Max rounds]"
-
-    print("=" * 70)
+    def print_reply(content: str) -> None:
+        ellipsis = "..." if len(content) > 200 else ""
+        print(f"\n  💬 {content[:200]}{ellipsis}")
+        print(f"  📊 Context: {tokens_in_context()} tokens, {len(store.current_branch_obj.messages)} messages")
+
+    def chat(user_message: str, label: str = "") -> str:
+        if label:
+            print(f"\n{SEP_50}")
+            print(f"  {label}")
+            print(f"{SEP_50}")
+
+        # Policies are checked once per round, after all of its messages
+        # (user turn included on the first round) are in the store
+        return run_agent_loop(
+            client, store, SYSTEM_PROMPT, user_message,
+            tools=TOOLS,
+            max_rounds=8,
+            on_message=track_message,
+            on_command=on_command,
+            on_round_end=apply_policies,
+            on_final=print_reply,
+            stream=True,
+        )
+
+    print(SEP_70)
     print("AUTO-NOTE POLICIES DEMO")
-    print("=" * 70)
+    print(SEP_70)
     print("\nPolicies configured:")
-    print("  • MaxMessagesPolicy: warn at 4, suggest note at 6 messages")
+    print("  • MaxMessagesPolicy: warn at 4, auto-note at 6 messages")
     print("  • MaxTokensPolicy: warn at 1500, suggest note at 2000 tokens")
     print("  • InactivityPolicy: suggest note after 4 messages since last note")
     print("\nWatch how the system monitors and suggests context management...\n")
@@ -167,57 +204,21 @@ def run_policies_demo():
     # =========================================================================
     # Simulate a conversation without manual notes
     # =========================================================================
-    chat("""
-    Start a new scope for this task. I need help designing a REST API
-    for a todo application. What endpoints should we have?
-    """, label="TASK START: API Design")
-
-    chat("""
-    Good list! Now let's detail the GET /todos endpoint.
-    What query parameters should it support for filtering and pagination?
-    """, label="STEP 2: GET Details")
-
-    chat("""
-    What about POST /todos? What should the request body look like?
-    Include validation requirements.
-    """, label="STEP 3: POST Details")
-
-    chat("""
-    Now explain PUT /todos/:id for updating a todo.
-    What's the difference between PUT and PATCH here?
-    """, label="STEP 4: PUT vs PATCH")
-
-    chat("""
-    How should we handle DELETE /todos/:id?
-    Should it be soft delete or hard delete?
-    """, label="STEP 5: DELETE Strategy")
-
-    chat("""
-    Let's add authentication. What auth strategy should we use?
-    JWT? Session-based? API keys?
-    """, label="STEP 6: Authentication")
-
-    chat("""
-    Finally, how do we handle errors consistently?
-    Give me an error response format.
-    """, label="STEP 7: Error Handling")
-
-    chat("""
-    Great session! Show me the status and log to see what happened.
-    """, label="REVIEW: Check Results")
+    # Closing the client releases its kept-alive connection
+    with create_client(api_key) as client:
+        for user_message, label in TURNS:
+            chat(user_message, label=label)
 
     # =========================================================================
     # Results
     # =========================================================================
-    print("\n" + "=" * 70)
+    print("\n" + SEP_70)
     print("POLICY MONITORING RESULTS")
-    print("=" * 70)
+    print(SEP_70)
 
     print("\n🔔 Policy Triggers:")
     if policy_triggers:
-        from collections import Counter
-        counts = Counter(policy_triggers)
-        for trigger, count in counts.items():
+        for trigger, count in Counter(policy_triggers).most_common():
             print(f"  {trigger}: {count} times")
     else:
         print("  (none)")
@@ -231,9 +232,7 @@ def run_policies_demo():
 
     print("\n📋 Notes Log:")
     result, _ = execute_command(store, "notes")
-    for line in result.split("\n"):
-        if line.strip():
-            print(f"  {line}")
+    print("\n".join(f"  {line}" for line in result.split("\n") if line.strip()))
 
     print("\n📊 Final Statistics:")
     total_notes = sum(len(s.commits) for s in store.branches.values())
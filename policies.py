@@ -10,6 +10,7 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from enum import Enum
+from functools import cached_property
 from typing import TYPE_CHECKING, Callable
 
 if TYPE_CHECKING:
@@ -25,9 +26,9 @@ class PolicyAction(Enum):
     BLOCK = "block"  # Prevent adding more messages
 
 
-@dataclass
+@dataclass(frozen=True)
 class PolicyResult:
-    """Result of evaluating a policy."""
+    """Result of evaluating a policy (immutable, so instances can be shared)."""
 
     triggered: bool
     action: PolicyAction | None = None
@@ -35,6 +36,44 @@ class PolicyResult:
     auto_commit_message: str | None = None
 
 
+# Shared result for every policy that doesn't trigger
+_NOT_TRIGGERED = PolicyResult(triggered=False)
+
+
+@dataclass
+class PolicySnapshot:
+    """
+    Store state read once per engine pass and shared by every policy.
+
+    The context size is only computed if a policy asks for it.
+    """
+
+    store: "ContextStore" = field(repr=False)
+    branch_name: str
+    message_count: int
+    commit_count: int
+
+    @classmethod
+    def from_store(cls, store: "ContextStore") -> "PolicySnapshot":
+        branch = store.current_branch_obj
+        return cls(
+            store=store,
+            branch_name=store.current_branch,
+            message_count=len(branch.messages),
+            commit_count=len(branch.commits),
+        )
+
+    @cached_property
+    def context_chars(self) -> int:
+        """Characters in the current context (without system prompt)."""
+        return self.store.get_context_chars()
+
+    @cached_property
+    def context_text(self) -> str:
+        """The current context as one string, for custom token counters."""
+        return "".join(str(m) for m in self.store.get_context())
+
+
 class Policy(ABC):
     """Base class for context policies."""
 
@@ -46,6 +85,10 @@ class Policy(ABC):
         """Evaluate if this policy should trigger."""
         ...
 
+    def check(self, snapshot: PolicySnapshot) -> PolicyResult:
+        """Evaluate against a precomputed snapshot (used by PolicyEngine)."""
+        return self.evaluate(snapshot.store)
+
 
 @dataclass
 class MaxMessagesPolicy(Policy):
@@ -62,11 +105,15 @@ class MaxMessagesPolicy(Policy):
     enabled: bool = True
 
     def evaluate(self, store: "ContextStore") -> PolicyResult:
+        return self.check(PolicySnapshot.from_store(store))
+
+    def check(self, snapshot: PolicySnapshot) -> PolicyResult:
         if not self.enabled:
-            return PolicyResult(triggered=False)
+            return _NOT_TRIGGERED
 
-        branch = store.branches[store.current_branch]
-        msg_count = len(branch.messages)
+        msg_count = snapshot.message_count
+        if msg_count < self.warn_at and msg_count < self.max_messages:
+            return _NOT_TRIGGERED
 
         if msg_count >= self.max_messages:
             return PolicyResult(
@@ -84,7 +131,7 @@ class MaxMessagesPolicy(Policy):
                 message=f"[POLICY] Working memory approaching limit: {msg_count}/{self.max_messages} messages.",
             )
 
-        return PolicyResult(triggered=False)
+        return _NOT_TRIGGERED
 
 
 @dataclass
@@ -101,6 +148,9 @@ class MaxTokensPolicy(Policy):
     action: PolicyAction = PolicyAction.SUGGEST_COMMIT
     enabled: bool = True
     token_counter: Callable[[str], int] | None = None  # Optional custom counter
+    # Optional precomputed token count (e.g. a running total kept by the
+    # caller); when set, the context text is never built
+    token_total: Callable[[], int] | None = None
 
     def _count_tokens(self, text: str) -> int:
         """Count tokens in text."""
@@ -110,13 +160,19 @@ class MaxTokensPolicy(Policy):
         return len(text) // 4
 
     def evaluate(self, store: "ContextStore") -> PolicyResult:
+        return self.check(PolicySnapshot.from_store(store))
+
+    def check(self, snapshot: PolicySnapshot) -> PolicyResult:
         if not self.enabled:
-            return PolicyResult(triggered=False)
+            return _NOT_TRIGGERED
 
-        # Count tokens in current context
-        context = store.get_context()
-        total_chars = sum(len(str(m)) for m in context)
-        estimated_tokens = self._count_tokens("x" * total_chars)
+        # Only a custom counter needs the text; the estimate works from its length
+        if self.token_total:
+            estimated_tokens = self.token_total()
+        elif self.token_counter:
+            estimated_tokens = self._count_tokens(snapshot.context_text)
+        else:
+            estimated_tokens = snapshot.context_chars // 4
 
         if estimated_tokens >= self.max_tokens:
             return PolicyResult(
@@ -134,7 +190,7 @@ class MaxTokensPolicy(Policy):
                 message=f"[POLICY] Context approaching limit: ~{estimated_tokens:,}/{self.max_tokens:,} tokens.",
             )
 
-        return PolicyResult(triggered=False)
+        return _NOT_TRIGGERED
 
 
 @dataclass
@@ -151,13 +207,17 @@ class InactivityPolicy(Policy):
     enabled: bool = True
 
     def evaluate(self, store: "ContextStore") -> PolicyResult:
+        return self.check(PolicySnapshot.from_store(store))
+
+    def check(self, snapshot: PolicySnapshot) -> PolicyResult:
         if not self.enabled:
-            return PolicyResult(triggered=False)
+            return _NOT_TRIGGERED
 
-        branch = store.branches[store.current_branch]
-        msg_count = len(branch.messages)
+        msg_count = snapshot.message_count
+        if msg_count < self.max_messages_since_commit:
+            return _NOT_TRIGGERED
 
-        if msg_count >= self.max_messages_since_commit and branch.commits:
+        if snapshot.commit_count:
             return PolicyResult(
                 triggered=True,
                 action=self.action,
@@ -166,7 +226,7 @@ class InactivityPolicy(Policy):
                 auto_commit_message=f"Checkpoint: {msg_count} messages since last commit",
             )
 
-        return PolicyResult(triggered=False)
+        return _NOT_TRIGGERED
 
 
 @dataclass
@@ -183,20 +243,21 @@ class NoCommitPolicy(Policy):
     enabled: bool = True
 
     def evaluate(self, store: "ContextStore") -> PolicyResult:
-        if not self.enabled:
-            return PolicyResult(triggered=False)
+        return self.check(PolicySnapshot.from_store(store))
 
-        branch = store.branches[store.current_branch]
+    def check(self, snapshot: PolicySnapshot) -> PolicyResult:
+        if not self.enabled:
+            return _NOT_TRIGGERED
 
-        if not branch.commits and len(branch.messages) >= self.min_messages:
+        if not snapshot.commit_count and snapshot.message_count >= self.min_messages:
             return PolicyResult(
                 triggered=True,
                 action=self.action,
-                message=f"[POLICY] Branch '{store.current_branch}' has no commits yet. "
+                message=f"[POLICY] Branch '{snapshot.branch_name}' has no commits yet. "
                 f"Consider committing before switching branches.",
             )
 
-        return PolicyResult(triggered=False)
+        return _NOT_TRIGGERED
 
 
 @dataclass
@@ -204,10 +265,24 @@ class PolicyEngine:
     """
     Engine that evaluates policies and takes actions.
 
-    The engine runs all policies and collects their results.
+    The engine runs all policies and collects their results. To reuse them,
+    pass the list from evaluate() to the helpers below.
+
+    With cache_results=True, evaluate() also reuses its last results until
+    the store's version or a policy's enabled flag changes. Only enable it
+    when the store is changed through ContextStore methods and policies
+    read nothing but the store; call clear_cache() after anything else
+    (e.g. editing a policy's thresholds).
     """
 
     policies: list[Policy] = field(default_factory=list)
+    cache_results: bool = False
+    _cache: tuple | None = field(default=None, init=False, repr=False, compare=False)
+    # First policy with each name, for the by-name methods below, and the
+    # list (and length) it was built from: policies is public, so a list
+    # replaced or resized directly triggers a rebuild on the next lookup
+    _by_name: dict[str, Policy] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _indexed: tuple | None = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         if not self.policies:
@@ -218,57 +293,106 @@ class PolicyEngine:
                 InactivityPolicy(),
                 NoCommitPolicy(),
             ]
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self._by_name = {}
+        for p in self.policies:
+            self._by_name.setdefault(p.name, p)
+        self._indexed = (self.policies, len(self.policies))
+
+    def _find(self, name: str) -> Policy | None:
+        indexed = self._indexed
+        if indexed is None or indexed[0] is not self.policies or indexed[1] != len(self.policies):
+            self._reindex()
+        return self._by_name.get(name)
+
+    def clear_cache(self) -> None:
+        """Forget cached results so the next evaluate() reruns every policy."""
+        self._cache = None
 
     def add_policy(self, policy: Policy) -> None:
         """Add a policy to the engine."""
         self.policies.append(policy)
+        self._cache = None
 
     def remove_policy(self, name: str) -> bool:
         """Remove a policy by name."""
-        for i, p in enumerate(self.policies):
-            if p.name == name:
-                self.policies.pop(i)
-                return True
-        return False
+        policy = self._find(name)
+        if policy is None:
+            return False
+        self.policies.remove(policy)
+        self._reindex()
+        self._cache = None
+        return True
 
     def enable_policy(self, name: str) -> bool:
         """Enable a policy by name."""
-        for p in self.policies:
-            if p.name == name:
-                p.enabled = True
-                return True
-        return False
+        policy = self._find(name)
+        if policy is None:
+            return False
+        policy.enabled = True
+        self._cache = None
+        return True
 
     def disable_policy(self, name: str) -> bool:
         """Disable a policy by name."""
-        for p in self.policies:
-            if p.name == name:
-                p.enabled = False
-                return True
-        return False
+        policy = self._find(name)
+        if policy is None:
+            return False
+        policy.enabled = False
+        self._cache = None
+        return True
 
     def evaluate(self, store: "ContextStore") -> list[PolicyResult]:
         """Evaluate all policies and return triggered results."""
+        if self.cache_results:
+            key = (store.version, tuple(p.enabled for p in self.policies))
+            cached = self._cache
+            if cached is not None and cached[0] is store and cached[1] == key:
+                return list(cached[2])
+
         results = []
+        snapshot = PolicySnapshot.from_store(store)
 
         for policy in self.policies:
-            result = policy.evaluate(store)
+            # Skip disabled policies without a call; custom policies may not check
+            if not policy.enabled:
+                continue
+            result = policy.check(snapshot)
             if result.triggered:
                 results.append(result)
 
+        if self.cache_results:
+            self._cache = (store, key, results)
         return results
 
-    def get_system_messages(self, store: "ContextStore") -> list[str]:
-        """Get system messages from triggered policies."""
-        results = self.evaluate(store)
+    def get_system_messages(
+        self,
+        store: "ContextStore",
+        results: list[PolicyResult] | None = None,
+    ) -> list[str]:
+        """
+        Get system messages from triggered policies.
+
+        Pass `results` from a prior evaluate() to avoid re-running the
+        policies; the same holds for should_force_commit and should_block.
+        """
+        if results is None:
+            results = self.evaluate(store)
         return [r.message for r in results if r.message and r.action in (
             PolicyAction.WARN,
             PolicyAction.SUGGEST_COMMIT,
         )]
 
-    def should_force_commit(self, store: "ContextStore") -> tuple[bool, str | None]:
+    def should_force_commit(
+        self,
+        store: "ContextStore",
+        results: list[PolicyResult] | None = None,
+    ) -> tuple[bool, str | None]:
         """Check if any policy requires forced commit."""
-        results = self.evaluate(store)
+        if results is None:
+            results = self.evaluate(store)
 
         for r in results:
             if r.action == PolicyAction.FORCE_COMMIT:
@@ -276,9 +400,14 @@ class PolicyEngine:
 
         return False, None
 
-    def should_block(self, store: "ContextStore") -> tuple[bool, str | None]:
+    def should_block(
+        self,
+        store: "ContextStore",
+        results: list[PolicyResult] | None = None,
+    ) -> tuple[bool, str | None]:
         """Check if any policy blocks adding messages."""
-        results = self.evaluate(store)
+        if results is None:
+            results = self.evaluate(store)
 
         for r in results:
             if r.action == PolicyAction.BLOCK:
@@ -5,111 +5,104 @@ from ctx_store import ContextStore, Message
 from ctx_cli import parse_command, execute_command
 
 
+# A fresh store per test: building one is cheaper than deepcopying a
+# shared template, and most TestContextStore tests mutate it
+@pytest.fixture
+def store():
+    return ContextStore()
+
+
+# (command, expected action, expected args) for well-formed commands
+PARSE_CASES = [
+    pytest.param('commit -m "test message"', "commit", {"message": "test message"}, id="commit"),
+    pytest.param(
+        'checkout -b new-branch -m "going to do X"', "checkout",
+        {"branch": "new-branch", "note": "going to do X", "create": True},
+        id="checkout-create",
+    ),
+    pytest.param(
+        'checkout main -m "back to main"', "checkout",
+        {"branch": "main", "create": False},
+        id="checkout-existing",
+    ),
+    pytest.param("branch", "branch", {"name": None}, id="branch-list"),
+    pytest.param("branch feature-x", "branch", {"name": "feature-x"}, id="branch-create"),
+    pytest.param(
+        'tag v1 -m "first version"', "tag",
+        {"name": "v1", "description": "first version"},
+        id="tag",
+    ),
+    pytest.param("tag v2", "tag", {"name": "v2", "description": ""}, id="tag-no-description"),
+    pytest.param("log", "log", {}, id="log"),
+    pytest.param("status", "status", {}, id="status"),
+    pytest.param("diff other-branch", "diff", {"branch": "other-branch"}, id="diff"),
+    pytest.param("history", "history", {}, id="history"),
+    pytest.param(
+        'stash push -m "work in progress"', "stash",
+        {"subaction": "push", "message": "work in progress"},
+        id="stash-push",
+    ),
+    pytest.param("stash pop", "stash", {"subaction": "pop"}, id="stash-pop"),
+    pytest.param("stash list", "stash", {"subaction": "list"}, id="stash-list"),
+]
+
+
 class TestParseCommand:
     """Test command parsing."""
 
-    def test_parse_commit(self):
-        result = parse_command('commit -m "test message"')
-        assert result.action == "commit"
-        assert result.args["message"] == "test message"
+    @pytest.mark.parametrize("command, action, args", PARSE_CASES)
+    def test_parse(self, command, action, args):
+        result = parse_command(command)
+        assert result.action == action
+        for key, value in args.items():
+            if value is None or isinstance(value, bool):
+                assert result.args[key] is value
+            else:
+                assert result.args[key] == value
 
     def test_parse_commit_missing_message(self):
         result = parse_command("commit")
         assert result.action == "error"
         assert "requires -m" in result.error
 
-    def test_parse_checkout_with_create(self):
-        result = parse_command('checkout -b new-branch -m "going to do X"')
-        assert result.action == "checkout"
-        assert result.args["branch"] == "new-branch"
-        assert result.args["note"] == "going to do X"
-        assert result.args["create"] is True
-
-    def test_parse_checkout_existing(self):
-        result = parse_command('checkout main -m "back to main"')
-        assert result.action == "checkout"
-        assert result.args["branch"] == "main"
-        assert result.args["create"] is False
-
     def test_parse_checkout_missing_note(self):
         result = parse_command("checkout some-branch")
         assert result.action == "error"
         assert "note is mandatory" in result.error
 
-    def test_parse_branch_list(self):
-        result = parse_command("branch")
-        assert result.action == "branch"
-        assert result.args["name"] is None
-
-    def test_parse_branch_create(self):
-        result = parse_command("branch feature-x")
-        assert result.action == "branch"
-        assert result.args["name"] == "feature-x"
-
-    def test_parse_tag(self):
-        result = parse_command('tag v1 -m "first version"')
-        assert result.action == "tag"
-        assert result.args["name"] == "v1"
-        assert result.args["description"] == "first version"
-
-    def test_parse_tag_no_description(self):
-        result = parse_command("tag v2")
-        assert result.action == "tag"
-        assert result.args["name"] == "v2"
-        assert result.args["description"] == ""
-
-    def test_parse_log(self):
-        result = parse_command("log")
-        assert result.action == "log"
-
-    def test_parse_status(self):
-        result = parse_command("status")
-        assert result.action == "status"
-
-    def test_parse_diff(self):
-        result = parse_command("diff other-branch")
-        assert result.action == "diff"
-        assert result.args["branch"] == "other-branch"
-
-    def test_parse_history(self):
-        result = parse_command("history")
-        assert result.action == "history"
-
-    def test_parse_stash_push(self):
-        result = parse_command('stash push -m "work in progress"')
-        assert result.action == "stash"
-        assert result.args["subaction"] == "push"
-        assert result.args["message"] == "work in progress"
-
-    def test_parse_stash_pop(self):
-        result = parse_command("stash pop")
-        assert result.action == "stash"
-        assert result.args["subaction"] == "pop"
-
-    def test_parse_stash_list(self):
-        result = parse_command("stash list")
-        assert result.action == "stash"
-        assert result.args["subaction"] == "list"
+    def test_split_command_matches_shlex(self):
+        import shlex
+        from ctx_cli import _split_command
+
+        for command in [
+            'note -m "Found the bug"', 'checkout -b x -m "it\'s done"', 'note -m ""',
+            'note -m"abc"', "note -m 'single'", 'note -m "a\\"b"', 'a\tb  "c d" ',
+            'tag v1 -m "x"y', 'note -m "a\xa0b"',
+        ]:
+            assert _split_command(command) == shlex.split(command)
+
+    def test_parse_result_is_shared_and_read_only(self):
+        result = parse_command('note -m "cached"')
+        assert parse_command('note -m "cached"') is result
+        with pytest.raises(TypeError):
+            result.args["message"] = "changed"
 
 
 class TestContextStore:
     """Test ContextStore operations."""
 
-    def test_initial_state(self):
-        store = ContextStore()
+    def test_initial_state(self, store):
         assert store.current_branch == "main"
         assert "main" in store.branches
         assert len(store.events) == 0
 
-    def test_add_message(self):
-        store = ContextStore()
+    def test_add_message(self, store):
         store.add_message(Message(role="user", content="hello"))
         branch = store.branches["main"]
         assert len(branch.messages) == 1
         assert branch.messages[0].content == "hello"
 
-    def test_commit(self):
-        store = ContextStore()
+    def test_commit(self, store):
         store.add_message(Message(role="user", content="test"))
         store.add_message(Message(role="assistant", content="response"))
 
@@ -125,8 +118,7 @@ class TestContextStore:
         assert len(branch.commits) == 1
         assert branch.commits[0].message == "Test commit"
 
-    def test_checkout_new_branch(self):
-        store = ContextStore()
+    def test_checkout_new_branch(self, store):
         result, event = store.checkout("feature", "Starting feature work", create=True)
 
         assert store.current_branch == "feature"
@@ -138,16 +130,14 @@ class TestContextStore:
         branch = store.branches["feature"]
         assert "Starting feature work" in branch.head_note
 
-    def test_checkout_nonexistent_without_create(self):
-        store = ContextStore()
+    def test_checkout_nonexistent_without_create(self, store):
         result, event = store.checkout("nonexistent", "note", create=False)
 
         assert "does not exist" in result
         assert event is None
         assert store.current_branch == "main"
 
-    def test_tag(self):
-        store = ContextStore()
+    def test_tag(self, store):
         store.add_message(Message(role="user", content="test"))
         store.commit("Initial commit")
 
@@ -158,15 +148,13 @@ class TestContextStore:
         assert "v1" in store.tags
         assert store.tags["v1"].description == "Version 1"
 
-    def test_tag_without_commit(self):
-        store = ContextStore()
+    def test_tag_without_commit(self, store):
         result, event = store.tag("v1", "No commits yet")
 
         assert "no commits" in result.lower()
         assert event is None
 
-    def test_tag_immutable(self):
-        store = ContextStore()
+    def test_tag_immutable(self, store):
         store.add_message(Message(role="user", content="test"))
         store.commit("Initial")
         store.tag("v1", "First")
@@ -176,8 +164,7 @@ class TestContextStore:
         assert "already exists" in result
         assert event is None
 
-    def test_log(self):
-        store = ContextStore()
+    def test_log(self, store):
         store.add_message(Message(role="user", content="test"))
         store.commit("First")
         store.add_message(Message(role="user", content="more"))
@@ -189,8 +176,21 @@ class TestContextStore:
         assert "Second" in result
         assert event.type == "log"
 
-    def test_status(self):
-        store = ContextStore()
+    def test_log_lines_match_log(self, store):
+        store.add_message(Message(role="user", content="test"))
+        store.commit("First")
+        store.tag("v1")
+        history_len = len(store.command_history)
+        event_count = len(store.events)
+
+        lines = list(store.log_lines())
+
+        assert len(store.command_history) == history_len
+        assert len(store.events) == event_count
+        assert "(tag: v1)" in lines[1]
+        assert "\n".join(lines) == store.log()[0]
+
+    def test_status(self, store):
         store.add_message(Message(role="user", content="test"))
 
         result, event = store.status()
@@ -199,8 +199,7 @@ class TestContextStore:
         assert "1" in result  # 1 working message
         assert event.type == "status"
 
-    def test_diff(self):
-        store = ContextStore()
+    def test_diff(self, store):
         store.add_message(Message(role="user", content="test"))
         store.commit("Main commit")
 
@@ -214,8 +213,7 @@ class TestContextStore:
         assert "feature" in result
         assert event.type == "diff"
 
-    def test_stash_and_pop(self):
-        store = ContextStore()
+    def test_stash_and_pop(self, store):
         store.add_message(Message(role="user", content="test1"))
         store.add_message(Message(role="user", content="test2"))
 
@@ -230,8 +228,7 @@ class TestContextStore:
         assert len(store.branches["main"].messages) == 2
         assert len(store.stash) == 0
 
-    def test_history(self):
-        store = ContextStore()
+    def test_history(self, store):
         store.add_message(Message(role="user", content="test"))
         store.commit("First")
         store.checkout("feat", "Feature", create=True)
@@ -241,8 +238,16 @@ class TestContextStore:
         assert "commit" in result
         assert "checkout" in result
 
-    def test_get_context(self):
-        store = ContextStore()
+    def test_events_by_type(self, store):
+        store.add_message(Message(role="user", content="test"))
+        store.commit("First")
+        store.checkout("feat", "Feature", create=True)
+
+        assert [e.type for e in store.events_by_type["commit"]] == ["commit"]
+        assert store.events_by_type["checkout"][0].branch == "feat"
+        assert sum(len(v) for v in store.events_by_type.values()) == len(store.events)
+
+    def test_get_context(self, store):
         store.add_message(Message(role="user", content="test"))
         store.commit("First commit")
         store.add_message(Message(role="user", content="second"))
@@ -254,16 +259,87 @@ class TestContextStore:
         assert context[0]["role"] == "system"
         assert "helpful" in context[0]["content"]
 
-    def test_get_context_with_head_note(self):
-        store = ContextStore()
+    def test_get_context_plan_keeps_system_prompt_stable(self, store):
+        store.add_message(Message(role="user", content="test"))
+        before = store.get_context("System")
+
+        store.set_plan("1. Do X")
+        context = store.get_context("System")
+
+        assert context[0] == before[0]
+        assert context[1]["role"] == "system"
+        assert "1. Do X" in context[1]["content"]
+
+    def test_get_context_memoized_until_branch_changes(self, store):
+        store.add_message(Message(role="user", content="first"))
+        first = store.get_context("System")
+        again = store.get_context("System")
+        assert again == first
+        assert again is not first
+
+        store.add_message(Message(role="assistant", content="second"))
+        assert store.get_context("System")[-1]["content"] == "second"
+
+        store.commit("Checkpoint")
+        assert not any(m.get("content") == "first" for m in store.get_context("System"))
+
+    def test_get_context_memo_kept_per_system_prompt(self, store, monkeypatch):
+        from ctx_store import Branch
+
+        store.add_message(Message(role="user", content="first"))
+        builds = []
+        original = Branch.get_messages_for_api
+        monkeypatch.setattr(
+            Branch, "get_messages_for_api",
+            lambda self, prompt=None: builds.append(prompt) or original(self, prompt),
+        )
+
+        for _ in range(3):
+            store.get_context("System")
+            store.get_context_chars()
+
+        assert builds == ["System", None]
+
+    def test_get_context_extends_after_settled_prefix(self, store):
+        store.add_message(Message(role="user", content="first"))
+        store.get_context("System")
+
+        store.add_message(Message(role="assistant", content="", tool_calls=[
+            {"id": "call_1", "type": "function", "function": {"name": "ctx_cli", "arguments": "{}"}},
+        ]))
+        store.add_message(Message(role="tool", content="ok", tool_call_id="call_1"))
+        store.add_message(Message(role="tool", content="orphan", tool_call_id="call_2"))
+        context = store.get_context("System")
+
+        rebuilt = store.current_branch_obj.get_messages_for_api("System")
+        assert context == rebuilt
+        assert [m["role"] for m in context] == ["system", "user", "assistant", "tool", "tool"]
+
+    def test_get_context_chars_follow_appends(self, store):
+        store.add_message(Message(role="user", content="first"))
+        assert store.get_context_chars() == sum(len(str(m)) for m in store.get_context())
+
+        store.add_message(Message(role="assistant", content="second"))
+        assert store.get_context_chars() == sum(len(str(m)) for m in store.get_context())
+
+        store.commit("Checkpoint")
+        assert store.get_context_chars() == sum(len(str(m)) for m in store.get_context())
+
+    def test_current_branch_obj_follows_checkout(self, store):
+        assert store.current_branch_obj is store.branches["main"]
+
+        store.checkout("feature", "Working on feature X", create=True)
+        assert store.current_branch_obj is store.branches["feature"]
+
+    def test_get_context_with_head_note(self, store):
         store.checkout("feature", "Working on feature X", create=True)
         store.add_message(Message(role="user", content="test"))
 
         context = store.get_context("System")
 
-        # Should contain transition note
-        has_transition = any("TRANSITION NOTE" in str(m) for m in context)
-        assert has_transition
+        # A new branch keeps the checkout note as its head note, outside the context
+        assert store.branches["feature"].head_note == "[From main] Working on feature X"
+        assert not any("Working on feature X" in m.get("content", "") for m in context)
 
 
 class TestExecuteCommand:
@@ -287,6 +363,15 @@ class TestExecuteCommand:
         assert store.current_branch == "feature"
         assert event is not None
 
+    def test_extract_command(self):
+        import json
+        from ctx_cli import extract_command
+
+        for command in ['note -m "Found the bug"', "scopes", 'note -m "a\\b"', "é\nnext"]:
+            assert extract_command(json.dumps({"command": command})) == command
+        assert extract_command('{"command": "notes", "extra": 1}') == "notes"
+        assert extract_command('{\n  "command": "goto main"\n}') == "goto main"
+
     def test_execute_invalid_command(self):
         store = ContextStore()
 
@@ -295,6 +380,15 @@ class TestExecuteCommand:
         assert "Unknown command" in result
         assert event is None
 
+    def test_unknown_command_word_checked_before_arguments(self):
+        result = parse_command('Frobnicate -m "unterminated')
+        assert result.action == "error"
+        assert result.error.startswith("Unknown command: frobnicate.")
+
+        # A quoted command word is still unquoted by the tokenizer
+        assert parse_command('"status"').action == "status"
+        assert parse_command('\tSTATUS\t').action == "status"
+
 
 class TestNewCommands:
     """Test new Git-like commands: merge, cherry-pick, bisect, reset."""
@@ -396,6 +490,21 @@ class TestNewCommands:
         assert event.type == "cherry-pick"
         assert len(store.branches["feature"].commits) == 2
 
+    def test_find_commit_by_prefix(self):
+        from ctx_store import Branch, Commit
+
+        branch = Branch(name="b")
+        for h in ["abcdef0111", "abcdef0222", "1234567999"]:
+            branch.commits.append(Commit(hash=h, message=h, timestamp="", messages_snapshot=[]))
+
+        assert branch.find_commit("abcdef0") == 0
+        assert branch.find_commit("abcdef02") == 1
+        assert branch.find_commit("123") == 2
+        assert branch.find_commit("fffffff") is None
+
+        branch.commits = branch.commits[:1]
+        assert branch.find_commit("1234567") is None
+
     def test_cherry_pick_by_tag(self):
         store = ContextStore()
         store.add_message(Message(role="user", content="test"))
@@ -483,6 +592,37 @@ class TestNewCommands:
         assert "reset" in result.lower()
         assert event.type == "bisect"
 
+    def test_bisect_good_without_ref_before_any_step(self):
+        store = ContextStore()
+        for i in range(3):
+            store.add_message(Message(role="user", content=f"test{i}"))
+            store.commit(f"Commit {i}")
+        commits = store.branches["main"].commits
+
+        store.bisect_start()
+        # No step has run yet, so good defaults to the first commit and bad to the last
+        result, _ = store.bisect_good()
+        assert f"Marked [{commits[0].hash[:7]}] as good" in result
+        result, _ = store.bisect_bad()
+        assert f"Marked [{commits[-1].hash[:7]}] as bad" in result
+
+    def test_execute_bisect_from_current_position(self):
+        store = ContextStore()
+        for i in range(5):
+            store.add_message(Message(role="user", content=f"test{i}"))
+            store.commit(f"Commit {i}")
+        commits = store.branches["main"].commits
+
+        execute_command(store, "bisect start")
+        execute_command(store, f"bisect good {commits[0].hash[:7]}")
+        result, event = execute_command(store, f"bisect bad {commits[-1].hash[:7]}")
+        assert f"Testing: [{commits[2].hash[:7]}]" in result
+
+        # Without a ref, good marks the commit under test
+        result, event = execute_command(store, "bisect good")
+        assert f"Marked [{commits[2].hash[:7]}] as good" in result
+        assert event.type == "bisect"
+
 
 class TestSerialization:
     """Test save/load functionality."""
@@ -537,6 +677,38 @@ class TestPolicies:
         assert result.triggered
         assert result.action == PolicyAction.SUGGEST_COMMIT
 
+    def test_max_tokens_policy_counter_gets_context_text(self):
+        from policies import MaxTokensPolicy, PolicyAction
+
+        seen = []
+        policy = MaxTokensPolicy(max_tokens=10, warn_at=5, token_counter=lambda text: seen.append(text) or 10)
+        store = ContextStore()
+        store.add_message(Message(role="user", content="hello policy"))
+
+        result = policy.evaluate(store)
+
+        assert result.action == PolicyAction.SUGGEST_COMMIT
+        assert "hello policy" in seen[0]
+        assert not MaxTokensPolicy(max_tokens=1000, warn_at=500).evaluate(store).triggered
+
+    def test_max_tokens_policy_uses_token_total(self):
+        from policies import MaxTokensPolicy, PolicyAction
+
+        seen = []
+        policy = MaxTokensPolicy(
+            max_tokens=10, warn_at=5,
+            token_counter=lambda text: seen.append(text) or 0,
+            token_total=lambda: 7,
+        )
+        store = ContextStore()
+        store.add_message(Message(role="user", content="hello policy"))
+
+        result = policy.evaluate(store)
+
+        assert result.action == PolicyAction.WARN
+        assert "~7/10" in result.message
+        assert seen == []
+
     def test_policy_engine(self):
         from policies import PolicyEngine
 
@@ -554,6 +726,114 @@ class TestPolicies:
         results = engine.evaluate(store)
         assert len(results) > 0
 
+    def test_policy_engine_caches_until_store_changes(self):
+        from dataclasses import dataclass
+        from policies import Policy, PolicyAction, PolicyEngine, PolicyResult
+
+        calls = []
+
+        @dataclass
+        class Counting(Policy):
+            name: str = "counting"
+
+            def evaluate(self, store):
+                calls.append(store.version)
+                return PolicyResult(triggered=True, action=PolicyAction.WARN, message="hi")
+
+        engine = PolicyEngine([Counting()], cache_results=True)
+        store = ContextStore()
+        engine.evaluate(store)
+        engine.get_system_messages(store)
+        assert len(calls) == 1
+
+        store.add_message(Message(role="user", content="new"))
+        engine.should_force_commit(store)
+        assert len(calls) == 2
+
+        engine.disable_policy("counting")
+        engine.enable_policy("counting")
+        engine.evaluate(store)
+        assert len(calls) == 3
+
+        # Flipping the flag directly also invalidates the cached results
+        engine.policies[0].enabled = False
+        assert engine.evaluate(store) == []
+
+    def test_policy_engine_sees_direct_changes_by_default(self):
+        from policies import MaxMessagesPolicy, PolicyEngine
+
+        policy = MaxMessagesPolicy(max_messages=5, warn_at=5)
+        engine = PolicyEngine([policy])
+        store = ContextStore()
+        assert engine.evaluate(store) == []
+
+        for i in range(5):
+            store.current_branch_obj.add_message(Message(role="user", content=str(i)))
+        assert len(engine.evaluate(store)) == 1
+
+        policy.enabled = False
+        assert engine.evaluate(store) == []
+
+    def test_policy_engine_by_name(self):
+        from policies import MaxTokensPolicy, PolicyEngine
+
+        first, second = MaxTokensPolicy(max_tokens=10), MaxTokensPolicy(max_tokens=20)
+        engine = PolicyEngine([first, second])
+
+        assert engine.disable_policy("max_tokens")
+        assert not first.enabled and second.enabled
+        assert engine.remove_policy("max_tokens")
+        assert engine.policies == [second]
+        assert engine.enable_policy("max_tokens") and second.enabled
+        assert not engine.remove_policy("missing")
+
+    def test_policy_engine_finds_policies_appended_directly(self):
+        from policies import InactivityPolicy, PolicyEngine
+
+        engine = PolicyEngine()
+        engine.policies = [p for p in engine.policies if p.name != "inactivity"]
+        added = InactivityPolicy()
+        engine.policies.append(added)
+
+        assert engine.disable_policy("inactivity")
+        assert not added.enabled
+
+    def test_policy_engine_custom_policy(self):
+        from dataclasses import dataclass
+        from policies import Policy, PolicyAction, PolicyEngine, PolicyResult
+
+        @dataclass
+        class AlwaysWarn(Policy):
+            name: str = "always_warn"
+
+            def evaluate(self, store):
+                return PolicyResult(triggered=True, action=PolicyAction.WARN, message=store.current_branch)
+
+        engine = PolicyEngine([AlwaysWarn()])
+        results = engine.evaluate(ContextStore())
+
+        assert [r.message for r in results] == ["main"]
+
+        engine.disable_policy("always_warn")
+        assert engine.evaluate(ContextStore()) == []
+
+    def test_policy_engine_reuses_results(self):
+        from policies import MaxMessagesPolicy, PolicyAction, PolicyEngine
+
+        engine = PolicyEngine([MaxMessagesPolicy(max_messages=2, warn_at=1, action=PolicyAction.FORCE_COMMIT)])
+        store = ContextStore()
+        store.add_message(Message(role="user", content="1"))
+        store.add_message(Message(role="user", content="2"))
+
+        results = engine.evaluate(store)
+        store.commit("Clear working memory")
+
+        # Helpers answer from the given results, not the store's current state
+        assert engine.should_force_commit(store, results)[0]
+        assert not engine.should_force_commit(store)[0]
+        assert engine.should_block(store, results) == (False, None)
+        assert engine.get_system_messages(store, results) == []
+
 
 class TestTokens:
     """Test token counting utilities."""
@@ -577,6 +857,47 @@ class TestTokens:
         count = tracker.count("Hello, world! This is a test.")
         assert count > 0
 
+    def test_count_tokens_tiktoken_is_memoized(self):
+        import tokens
+
+        tokens.reset_token_cache()
+        first = tokens.count_tokens_tiktoken("You are a helpful assistant.")
+        assert tokens.count_tokens_tiktoken("You are a helpful assistant.") == first
+        assert tokens._cached_encode_count.cache_info().hits == 1
+
+        # Very long strings bypass the cache
+        tokens.count_tokens_tiktoken("x" * (tokens._TOKEN_CACHE_MAX_CHARS + 1))
+        assert tokens._cached_encode_count.cache_info().currsize == 1
+
+    def test_count_context_tokens_with_encoding(self, monkeypatch):
+        import tokens
+
+        encoded = []
+
+        class WordEncoding:
+            def encode(self, text):
+                encoded.append(text)
+                return text.split()
+
+        monkeypatch.setattr(tokens, "TIKTOKEN_AVAILABLE", True)
+        monkeypatch.setattr(tokens, "get_encoding", lambda model: WordEncoding())
+        tokens.reset_token_cache()
+        try:
+            messages = [
+                {"role": "system", "content": "You are a helpful assistant."},
+                {"role": "user", "content": "Hello there"},
+            ]
+            # 5 + 2 words, 1 per role, 4 overhead per message, 3 reply priming
+            assert tokens.count_context_tokens(messages) == 7 + 2 + 8 + 3
+
+            encoded.clear()
+            messages.append({"role": "user", "content": "Hi"})
+            tokens.count_context_tokens(messages)
+            # Only the new text is encoded; the rest come from the memo
+            assert encoded == ["Hi"]
+        finally:
+            tokens.reset_token_cache()
+
     def test_count_message_tokens(self):
         from tokens import count_message_tokens
 
@@ -584,9 +905,62 @@ class TestTokens:
         count = count_message_tokens(msg)
         assert count > 0
 
+    def test_count_message_tokens_without_content(self):
+        from tokens import count_message_tokens
+
+        empty = count_message_tokens({"role": "assistant", "content": ""})
+        assert count_message_tokens({"role": "assistant", "content": None}) == empty
+
+        # A tool-call-only message doesn't count its None content as text
+        tool_call = {"function": {"name": "ctx_cli", "arguments": "{}"}}
+        with_none = count_message_tokens({"role": "assistant", "content": None, "tool_calls": [tool_call]})
+        with_empty = count_message_tokens({"role": "assistant", "content": "", "tool_calls": [tool_call]})
+        assert with_none == with_empty > empty
+
+    def test_count_message_tokens_content_parts(self):
+        from tokens import count_message_tokens
+
+        text_only = count_message_tokens({"role": "user", "content": "Describe this image"})
+        with_image = count_message_tokens({"role": "user", "content": [
+            {"type": "text", "text": "Describe this image"},
+            {"type": "image_url", "image_url": {"url": "https://example.com/a.png"}},
+        ]})
+        assert with_image == text_only + 85
+
     def test_get_model_context_limit(self):
         from tokens import get_model_context_limit
 
         assert get_model_context_limit("gpt-4o") == 128000
         assert get_model_context_limit("gpt-4") == 8192
         assert get_model_context_limit("unknown-model") == 128000
+        # Versioned names resolve to the longest matching family
+        assert get_model_context_limit("gpt-4-turbo-2024-04-09") == 128000
+        assert get_model_context_limit("GPT-4-0613") == 8192
+        assert get_model_context_limit("gpt-4.1-mini") == 1047576
+        assert get_model_context_limit("gpt-4.1-2025-04-14") == 1047576
+
+    def test_token_tracker_count_messages_matches_context_count(self):
+        from tokens import TokenTracker, count_context_tokens
+
+        tracker = TokenTracker(model="gpt-4o")
+        messages = [
+            {"role": "system", "content": "You are helpful."},
+            {"role": "user", "content": "Hello, how are you?"},
+        ]
+
+        assert tracker.count_messages(messages) == count_context_tokens(messages, "gpt-4o")
+        # Second call is served from the per-message memo
+        assert tracker.count_messages(messages) == count_context_tokens(messages, "gpt-4o")
+
+    def test_token_tracker_update_context_after_append_and_truncate(self):
+        from tokens import TokenTracker, count_context_tokens
+
+        tracker = TokenTracker(model="gpt-4o")
+        messages = [{"role": "system", "content": "You are helpful."}]
+        tracker.update_context(messages)
+
+        messages = messages + [{"role": "user", "content": "Hello, how are you?"}]
+        assert tracker.update_context(messages) == count_context_tokens(messages, "gpt-4o")
+
+        messages = messages[:1] + [{"role": "user", "content": "Something else entirely."}]
+        assert tracker.update_context(messages) == count_context_tokens(messages, "gpt-4o")
@@ -7,9 +7,10 @@ with fallback to estimation for other models.
 
 from __future__ import annotations
 
-import json
+import threading
 from functools import lru_cache
-from typing import TYPE_CHECKING
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Mapping
 
 if TYPE_CHECKING:
     from ctx_store import Message
@@ -22,27 +23,66 @@ except ImportError:
     TIKTOKEN_AVAILABLE = False
 
 
-@lru_cache(maxsize=4)
+# Encodings by model name. Loading one reads its BPE tables, so the lock
+# keeps concurrent trackers from loading the same model twice.
+_ENCODINGS: dict[str, "tiktoken.Encoding"] = {}
+_ENCODINGS_LOCK = threading.Lock()
+
+
 def get_encoding(model: str) -> "tiktoken.Encoding | None":
     """Get tiktoken encoding for a model."""
     if not TIKTOKEN_AVAILABLE:
         return None
 
-    try:
-        return tiktoken.encoding_for_model(model)
-    except KeyError:
-        # Fallback to cl100k_base for unknown models
-        return tiktoken.get_encoding("cl100k_base")
+    encoding = _ENCODINGS.get(model)
+    if encoding is not None:
+        return encoding
+
+    with _ENCODINGS_LOCK:
+        encoding = _ENCODINGS.get(model)
+        if encoding is None:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                # Fallback to cl100k_base for unknown models (cached too,
+                # so the failed lookup isn't repeated)
+                encoding = tiktoken.get_encoding("cl100k_base")
+            _ENCODINGS[model] = encoding
+    return encoding
+
+
+# Longer strings are encoded without being kept in the count cache
+_TOKEN_CACHE_MAX_CHARS = 200_000
 
 
 def count_tokens_tiktoken(text: str, model: str = "gpt-4o") -> int:
-    """Count tokens using tiktoken."""
+    """
+    Count tokens using tiktoken.
+
+    Counts are memoized per (text, model), so recurring system prompts and
+    history are only encoded once.
+    """
+    if len(text) > _TOKEN_CACHE_MAX_CHARS:
+        return _encode_count(text, model)
+    return _cached_encode_count(text, model)
+
+
+def _encode_count(text: str, model: str) -> int:
     encoding = get_encoding(model)
     if encoding is None:
         return estimate_tokens(text)
     return len(encoding.encode(text))
 
 
+_cached_encode_count = lru_cache(maxsize=4096)(_encode_count)
+
+
+def reset_token_cache() -> None:
+    """Drop memoized token counts (e.g. between tests)."""
+    _cached_encode_count.cache_clear()
+    _role_tokens.cache_clear()
+
+
 def estimate_tokens(text: str) -> int:
     """
     Estimate token count without tiktoken.
@@ -52,32 +92,52 @@ def estimate_tokens(text: str) -> int:
     return max(1, len(text) // 4)
 
 
-def count_message_tokens(
-    message: dict,
-    model: str = "gpt-4o",
-) -> int:
-    """
-    Count tokens in a single message.
+# Base overhead per message (role, separators)
+_MESSAGE_OVERHEAD = 4  # <|im_start|>role<|im_sep|>...<|im_end|>
 
-    Accounts for message structure overhead (role, etc).
-    """
-    # Base overhead per message (role, separators)
-    overhead = 4  # <|im_start|>role<|im_sep|>...<|im_end|>
 
+@lru_cache(maxsize=64)
+def _role_tokens(role: str, model: str) -> int:
+    """Tokens for a role name, counted once per (role, model)."""
+    if not role:
+        return 0
+    return count_tokens_tiktoken(role, model)
+
+
+# Flat token cost of non-text content parts (low-detail image, short audio clip)
+_MEDIA_PART_TOKENS: Mapping[str, int] = MappingProxyType({
+    "image_url": 85,
+    "input_audio": 50,
+})
+
+
+def _media_tokens(content: object) -> int:
+    """Tokens charged for the image/audio parts of a content array."""
+    if not isinstance(content, list):
+        return 0
+    return sum(
+        _MEDIA_PART_TOKENS.get(part.get("type"), 0)
+        for part in content if isinstance(part, dict)
+    )
+
+
+def _message_text(message: dict) -> str:
+    """Text of a message as counted for tokens: content, tool calls, name."""
     content = message.get("content", "")
     if isinstance(content, str):
         text = content
+    elif content is None:
+        # Assistant messages that only carry tool_calls
+        text = ""
     elif isinstance(content, list):
-        # Handle content arrays (for images, etc)
-        text = " ".join(
-            part.get("text", "") for part in content if isinstance(part, dict)
+        # Handle content arrays (for images, etc); media parts are costed
+        # separately by _media_tokens
+        text = "".join(
+            part["text"] for part in content if isinstance(part, dict) and part.get("text")
         )
     else:
         text = str(content)
 
-    # Add role
-    text += message.get("role", "")
-
     # Add function/tool call info if present
     if "tool_calls" in message and message["tool_calls"]:
         for tc in message["tool_calls"]:
@@ -88,6 +148,25 @@ def count_message_tokens(
     if "name" in message:
         text += message["name"]
 
+    return text
+
+
+def count_message_tokens(
+    message: dict,
+    model: str = "gpt-4o",
+) -> int:
+    """
+    Count tokens in a single message.
+
+    Accounts for message structure overhead (role, etc).
+    """
+    overhead = _MESSAGE_OVERHEAD + _role_tokens(message.get("role", ""), model)
+    if not message.get("content") and not message.get("tool_calls") and "name" not in message:
+        # Nothing to encode beyond the role
+        return overhead
+
+    text = _message_text(message)
+    overhead += _media_tokens(message.get("content"))
     if TIKTOKEN_AVAILABLE:
         return count_tokens_tiktoken(text, model) + overhead
     return estimate_tokens(text) + overhead
@@ -105,6 +184,8 @@ def count_context_tokens(
     total = 0
 
     for msg in messages:
+        # Each text goes through the count_tokens_tiktoken memo, so an
+        # unchanged system prompt or history is not re-encoded
         total += count_message_tokens(msg, model)
 
     # Add reply priming overhead
@@ -113,28 +194,45 @@ def count_context_tokens(
     return total
 
 
+# Context window per model family, matched as a substring of the model name
+_MODEL_LIMITS: Mapping[str, int] = MappingProxyType({
+    # OpenAI
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4.1-mini": 1047576,
+    "gpt-4.1-nano": 1047576,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    # Anthropic (approximate)
+    "claude-3-opus": 200000,
+    "claude-3-sonnet": 200000,
+    "claude-3-haiku": 200000,
+    # Default
+    "default": 128000,
+})
+
+# Longest names first, so "gpt-4o-mini" wins over "gpt-4o" and "gpt-4"
+_LIMITS_BY_LENGTH = sorted(
+    ((key, limit) for key, limit in _MODEL_LIMITS.items() if key != "default"),
+    key=lambda item: -len(item[0]),
+)
+
+
+@lru_cache(maxsize=64)
 def get_model_context_limit(model: str) -> int:
     """Get the context window limit for a model."""
-    limits = {
-        # OpenAI
-        "gpt-4o": 128000,
-        "gpt-4o-mini": 128000,
-        "gpt-4-turbo": 128000,
-        "gpt-4": 8192,
-        "gpt-3.5-turbo": 16385,
-        # Anthropic (approximate)
-        "claude-3-opus": 200000,
-        "claude-3-sonnet": 200000,
-        "claude-3-haiku": 200000,
-        # Default
-        "default": 128000,
-    }
-
-    for key, limit in limits.items():
-        if key in model.lower():
+    model = model.lower()
+    limit = _MODEL_LIMITS.get(model)
+    if limit is not None:
+        return limit
+
+    for key, limit in _LIMITS_BY_LENGTH:
+        if key in model:
             return limit
 
-    return limits["default"]
+    return _MODEL_LIMITS["default"]
 
 
 class TokenTracker:
@@ -146,24 +244,67 @@ class TokenTracker:
 
     def __init__(self, model: str = "gpt-4o"):
         self.model = model
+        # Resolved once so the BPE tables are loaded before any timed section
+        self.encoding = get_encoding(model)
         self.context_limit = get_model_context_limit(model)
         self.total_input_tokens = 0
         self.total_output_tokens = 0
         self.current_context_tokens = 0
+        # Per-message token counts, so each round only tokenizes new messages
+        self._message_tokens: dict[tuple, int] = {}
+        # (messages, per-message counts) from the last update_context call
+        self._context_counts: tuple[list[dict], list[int]] = ([], [])
 
     def count(self, text: str) -> int:
         """Count tokens in text."""
-        if TIKTOKEN_AVAILABLE:
-            return count_tokens_tiktoken(text, self.model)
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
         return estimate_tokens(text)
 
+    def count_message(self, message: dict) -> int:
+        """Count tokens in a single message, memoized by its contents."""
+        content = message.get("content", "")
+        if not isinstance(content, str):
+            return count_message_tokens(message, self.model)
+
+        tool_calls = message.get("tool_calls") or ()
+        key = (
+            message.get("role", ""),
+            content,
+            message.get("name"),
+            tuple(
+                (tc.get("function", {}).get("name", ""), tc.get("function", {}).get("arguments", ""))
+                for tc in tool_calls if isinstance(tc, dict)
+            ),
+        )
+        tokens = self._message_tokens.get(key)
+        if tokens is None:
+            tokens = count_message_tokens(message, self.model)
+            self._message_tokens[key] = tokens
+        return tokens
+
     def count_messages(self, messages: list[dict]) -> int:
         """Count tokens in message list."""
-        return count_context_tokens(messages, self.model)
+        # Same total as count_context_tokens, including reply priming
+        return sum(self.count_message(m) for m in messages) + 3
 
     def update_context(self, messages: list[dict]) -> int:
-        """Update current context token count."""
-        self.current_context_tokens = self.count_messages(messages)
+        """Update current context token count.
+
+        Messages shared (by identity) with the previous call's leading
+        messages reuse their counts, so a turn that appends only counts
+        the new tail. Counted message dicts are assumed not to change.
+        """
+        previous, counts = self._context_counts
+        same = 0
+        limit = min(len(previous), len(messages))
+        while same < limit and previous[same] is messages[same]:
+            same += 1
+
+        counts = counts[:same] + [self.count_message(m) for m in messages[same:]]
+        self._context_counts = (list(messages), counts)
+        # Same total as count_messages, including reply priming
+        self.current_context_tokens = sum(counts) + 3
         return self.current_context_tokens
 
     def add_input(self, tokens: int) -> None:
@@ -188,6 +329,7 @@ class TokenTracker:
 
     def get_stats(self) -> dict:
         """Get token usage statistics."""
+        total = self.total_input_tokens + self.total_output_tokens
         return {
             "model": self.model,
             "context_limit": self.context_limit,
@@ -196,7 +338,7 @@ class TokenTracker:
             "remaining": self.get_remaining(),
             "total_input": self.total_input_tokens,
             "total_output": self.total_output_tokens,
-            "total": self.total_input_tokens + self.total_output_tokens,
+            "total": total,
             "tiktoken_available": TIKTOKEN_AVAILABLE,
         }
 